@@ -1,25 +1,77 @@
+from datetime import datetime
+from datetime import timezone
+from os import cpu_count
 from pathlib import Path
+from signal import SIGHUP
+from time import perf_counter
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Type
+from typing import TypeVar
 from urllib.parse import unquote
 
 from environs import Env
-from jinja2 import Environment
-from jinja2 import FileSystemLoader
+from sanic import HTTPResponse
+from sanic import Request
 from sanic import Sanic
+from sanic.response import empty
 from sanic.response import html
-from sanic.response import text
+from sanic.response import raw
 from spotipy import Spotify as Spotipy
 from spotipy.oauth2 import SpotifyClientCredentials as SCC
 
 from bridges.blog import Blog
+from bridges.blog.asset import IMMUTABLE
+from bridges.blog.asset import Manifest
+from bridges.blog.asset import VERSION_ARGUMENT
+from bridges.blog.compress import MISSING as MISSING_COMPRESSORS
+from bridges.blog.compress import negotiate
+from bridges.blog.container import Post
+from bridges.blog.image import ImagePipeline
+from bridges.blog.page import CachedPage
+from bridges.blog.page import format_http_date
+from bridges.blog.page import not_modified
+from bridges.blog.page import Page
+from bridges.blog.util import info
 from bridges.blog.util import Url
+from bridges.blog.util import warning
+from bridges.github import API_URL as GITHUB_API_URL
 from bridges.github import GitHub
+from bridges.github import Repo
+from bridges.scheduler import Scheduler
+from bridges.spotify import Playlist
 from bridges.spotify import Spotify
+from bridges.store import Store
+from critical import CriticalCss
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import expose
+from metrics import Histogram
+from templating import build_environment
+from templating import invalidate
 
 DEFAULT_PUBLIC_URL = "/static/public"
 DEFAULT_BLOG_STATIC_URL = "/static/blog/post"
+DEFAULT_BLOG_IMAGE_URL = "/static/blog/image"
+DEFAULT_DIST_URL = "/static/dist"
 
 RSS_ROUTE = "blog/rss"
+ATOM_ROUTE = "blog/atom"
+JSON_FEED_ROUTE = "blog/json"
 RSS_POST_ROUTE_PARTIAL = "blog/post"
+TAG_ROUTE_PARTIAL = "blog/tag"
+METRICS_ROUTE = "metrics"
+
+HTML_CONTENT_TYPE = "text/html; charset=utf-8"
+RSS_CONTENT_TYPE = "text/xml"
+ATOM_CONTENT_TYPE = "application/atom+xml"
+JSON_FEED_CONTENT_TYPE = "application/feed+json"
+
+# Templates (and therefore the home page) can only change across restarts
+BOOT = datetime.now(timezone.utc)
+
+T = TypeVar("T")
 
 env = Env()
 
@@ -33,40 +85,94 @@ with env.prefixed("PT_"):
     address = env.str("ADDRESS", "0.0.0.0")  # nosec
     port = env.int("PORT", 5000)
     debug = env.bool("DEBUG", False)
+    # Templates compiled by `templating.py`, used instead of their sources
+    template_module_path = env.path("TEMPLATE_MODULE_PATH", None)
+    # Bytecode of templates compiled at runtime is persisted here (disabled if
+    # unset)
+    template_cache_path = env.path("TEMPLATE_CACHE_PATH", None)
+    # Modified templates are otherwise only picked up once the app receives
+    # `SIGHUP`
+    template_auto_reload = env.bool("TEMPLATE_AUTO_RELOAD", debug)
     static_handler = env.bool("ENABLE_STATIC_HANDLER", True)
+    # Exposes metrics in the Prometheus format (which should not be public)
+    enable_metrics = env.bool("ENABLE_METRICS", False)
     blog_path = env.path("BLOG_PATH", "./blog")
+    # Seconds without file system events before the blog is refreshed, and
+    # upper bound for how long a stream of events can defer a refresh
+    blog_refresh_delay = env.float("BLOG_REFRESH_DELAY", 0.5)
+    blog_refresh_max_delay = env.float("BLOG_REFRESH_MAX_DELAY", 5.0)
+    # Number of processes used to render posts, small blogs are always rendered
+    # serially
+    blog_workers = env.int("BLOG_WORKERS", cpu_count() or 1)
+    # Rendered posts are persisted here to speed up restarts (disabled if unset)
+    blog_cache_path = env.path("BLOG_CACHE_PATH", None)
+    # Maximum number of posts in the feeds (`0` disables the limit)
+    feed_limit = env.int("FEED_LIMIT", 20)
+    # Resized variants of blog images are written here, has to be located outside
+    # of `BLOG_PATH` (disabled if unset)
+    blog_image_path = env.path("BLOG_IMAGE_PATH", None)
     public_url = env.furl("PUBLIC_URL", DEFAULT_PUBLIC_URL)
     blog_static_url = env.furl("BLOG_STATIC_URL", DEFAULT_BLOG_STATIC_URL)
+    blog_image_url = env.furl("BLOG_IMAGE_URL", DEFAULT_BLOG_IMAGE_URL)
+    dist_url = env.furl("DIST_URL", DEFAULT_DIST_URL)
     fq_url = env.furl("FQ_URL", f"http://localhost:{port}")
 
     # Disabled by default because rate limit can be hit relatively easily
     # during development
     enable_github = env.bool("ENABLE_GITHUB", False)
     github_user = env.str("GITHUB_USER", "PhilipTrauner")
+    # Repos (`owner/name`) shown in addition to the ones owned by `GITHUB_USER`
+    github_additional_repos = env.list("GITHUB_ADDITIONAL_REPOS", [])
+    github_include_orgs = env.bool("GITHUB_INCLUDE_ORGS", False)
+    github_api_url = env.str("GITHUB_API_URL", GITHUB_API_URL)
     # Disabled by default because credentials are necessary
     enable_spotify = env.bool("ENABLE_SPOTIFY", False)
     spotify_user = env.str("SPOTIFY_USER", "philip.trauner")
     spotify_client_id = env.str("SPOTIFY_CLIENT_ID", None)
     spotify_client_secret = env.str("SPOTIFY_CLIENT_SECRET", None)
+    # Last fetched data of bridges is persisted here and served right after
+    # startup (disabled if unset)
+    bridge_store_path = env.path("BRIDGE_STORE_PATH", None)
+    # Seconds after which persisted data is no longer served
+    bridge_store_max_age = env.float("BRIDGE_STORE_MAX_AGE", 7 * 24 * 60 * 60)
 
 app = Sanic(name="app")
 
 if static_handler:
     app.static(DEFAULT_PUBLIC_URL, "./public", name="public")
+    app.static(DEFAULT_DIST_URL, "./dist", name="dist")
     app.static(DEFAULT_BLOG_STATIC_URL, str(blog_path / "post"), name="blog_static")
+    if blog_image_path is not None:
+        app.static(DEFAULT_BLOG_IMAGE_URL, str(blog_image_path), name="blog_image")
 
 transformed_public_url = Url(public_url)
 transformed_blog_static_url = Url(blog_static_url)
+transformed_dist_url = Url(dist_url)
+
+jinja_env = build_environment(
+    template_module_path, template_cache_path, template_auto_reload
+)
 
-jinja_env = Environment(
-    loader=FileSystemLoader([str(Path("template")), str(Path("dist"))]),
-    # https://github.com/hyde/hyde-old/issues/68
-    comment_start_string="{##",
-    comment_end_string="##}",
-    trim_blocks=True,
-    lstrip_blocks=True,
-    autoescape=True,
+# Post content is versioned while posts are rendered, and only looked up here to
+# validate versions of requested URLs
+assets = Manifest(
+    {
+        str(transformed_public_url): Path("public"),
+        str(transformed_blog_static_url): blog_path / "post",
+        str(transformed_dist_url): Path("dist"),
+    }
 )
+# `{{ asset(public_url / 'icon/favicon.png') }}`
+jinja_env.globals["asset"] = assets.url
+critical_css = CriticalCss(transformed_dist_url)
+jinja_env.globals["critical_css"] = critical_css
+
+
+def store(name: str, new: Type[T]) -> Optional[Store[T]]:
+    if bridge_store_path is None:
+        return None
+    return Store(bridge_store_path / f"{name}.json", new, bridge_store_max_age)
+
 
 spotify = (
     Spotify(
@@ -76,14 +182,60 @@ spotify = (
                 client_id=spotify_client_id, client_secret=spotify_client_secret
             )
         ),
+        store=store("spotify", Playlist),
     )
     if enable_spotify
     else None
 )
 
-github = GitHub(github_user) if enable_github else None
+github = (
+    GitHub(
+        github_user,
+        additional_repos=github_additional_repos,
+        include_orgs=github_include_orgs,
+        base_url=github_api_url,
+        store=store("github", Repo),
+    )
+    if enable_github
+    else None
+)
 
 rss_url = fq_url / RSS_ROUTE
+atom_url = fq_url / ATOM_ROUTE
+json_feed_url = fq_url / JSON_FEED_ROUTE
+
+
+def render_post(
+    post: Optional[Post], rendered: Optional[Post._RenderedPost] = None
+) -> str:
+    return jinja_env.get_template("blog-post.jinja").render(
+        public_url=transformed_public_url,
+        blog_static_url=transformed_blog_static_url,
+        post=post,
+        rendered=rendered,
+        rss_url=rss_url,
+    )
+
+
+def render_home() -> str:
+    return jinja_env.get_template("home.jinja").render(
+        repos=github.repos if github is not None else [],
+        public_url=transformed_public_url,
+        playlists=spotify.playlists if spotify is not None else [],
+        posts=blog.visible_posts,
+        rss_url=rss_url,
+    )
+
+
+def render_tag(tag: str, posts: Sequence[Post]) -> str:
+    return jinja_env.get_template("blog-tag.jinja").render(
+        public_url=transformed_public_url, posts=posts, tag=tag
+    )
+
+
+# Pages are compressed as they're built
+for package in MISSING_COMPRESSORS:
+    warning(f"{package} is not installed, its encoding won't be offered")
 
 blog = Blog(
     blog_path,
@@ -93,63 +245,199 @@ blog = Blog(
     "en-US",
     fq_url / RSS_POST_ROUTE_PARTIAL,
     rss_url,
+    atom_url,
+    json_feed_url,
+    render_post,
+    render_tag,
+    blog_refresh_delay,
+    blog_refresh_max_delay,
+    blog_workers,
+    blog_cache_path,
+    feed_limit if feed_limit > 0 else None,
+    ImagePipeline(blog_image_path, Url(blog_image_url))
+    if blog_image_path is not None
+    else None,
 )
 
 
+# The home page is only rendered again once the blog or a bridge changes
+def home_key() -> Tuple[int, ...]:
+    return (
+        blog.generation,
+        github.generation if github is not None else -1,
+        spotify.generation if spotify is not None else -1,
+    )
+
+
+def build_home() -> Tuple[bytes, datetime]:
+    modified = [BOOT, blog.rss.last_modified]
+
+    for bridge in (github, spotify):
+        if bridge is not None:
+            modified.append(datetime.fromtimestamp(bridge.last_modified, timezone.utc))
+
+    return render_home().encode(), max(modified)
+
+
+home_page = CachedPage(home_key, build_home)
+
+
+# Picks up modified templates, every cached page is rendered again
+def reload_templates() -> None:
+    info("Reloading templates")
+
+    invalidate(jinja_env)
+    # `make critical` splits stylesheets according to the templates
+    critical_css.reload()
+    blog.rerender()
+    home_page.invalidate()
+
+
+def validator_headers(etag: str, last_modified: datetime) -> Dict[str, str]:
+    return {"ETag": etag, "Last-Modified": format_http_date(last_modified)}
+
+
+def is_fresh(request: Request, etag: str, last_modified: datetime) -> bool:
+    return not_modified(
+        request.headers.get("If-None-Match", None),
+        request.headers.get("If-Modified-Since", None),
+        etag,
+        last_modified,
+    )
+
+
+def respond(request: Request, page: Page, content_type: str) -> HTTPResponse:
+    encoding = negotiate(request.headers.get("Accept-Encoding", None), page.variants)
+    body, etag = page.representation(encoding)
+
+    headers = validator_headers(etag, page.last_modified)
+    headers["Vary"] = "Accept-Encoding"
+
+    if is_fresh(request, etag, page.last_modified):
+        return empty(status=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return raw(body, headers=headers, content_type=content_type)
+
+
+# Versioned URLs never change their content, unless the version is outdated (a
+# page rendered before the asset was modified)
+@app.on_response
+async def cache_static(request, response):
+    if response.status != 200:
+        return
+
+    # Variants are named after the digest of their content
+    immutable = blog_image_path is not None and request.path.startswith(
+        f"{blog_image_url}/"
+    )
+    version = request.args.get(VERSION_ARGUMENT, None)
+
+    if immutable or (
+        version is not None and version == assets.version(unquote(request.path))
+    ):
+        response.headers["Cache-Control"] = IMMUTABLE
+
+
+request_durations = Histogram()
+
+if enable_metrics:
+
+    @app.on_request
+    async def start_timer(request):
+        request.ctx.start = perf_counter()
+
+    @app.on_response
+    async def observe_duration(request, response):
+        start = getattr(request.ctx, "start", None)
+        if start is not None:
+            request_durations.observe(
+                request.route.name if request.route is not None else "unmatched",
+                perf_counter() - start,
+            )
+
+
 # Wildcard route
 @app.route("/", name="root")
 # Necessitates `**kwargs` necessary
 @app.route("/<path>", name="home")
-async def home(_, **kwargs):
-    return html(
-        jinja_env.get_template("home.jinja").render(
-            repos=github.repos if github is not None else [],
-            public_url=transformed_public_url,
-            playlists=spotify.playlists if spotify is not None else [],
-            posts=blog.posts,
-            rss_url=rss_url,
-        )
-    )
+async def home(request, **kwargs):
+    return respond(request, await home_page.get_async(), HTML_CONTENT_TYPE)
 
 
 @app.route(f"{RSS_POST_ROUTE_PARTIAL}/<post>", name="post")
-async def blog_post(_, post):
-    post = blog.find_post(unquote(post))
-
-    return html(
-        jinja_env.get_template("blog-post.jinja").render(
-            public_url=transformed_public_url,
-            blog_static_url=transformed_blog_static_url,
-            post=post,
-            rendered=post.render(transformed_blog_static_url)
-            if post is not None
-            else None,
-            rss_url=rss_url,
-        ),
-        status=200 if post else 404,
-    )
+async def blog_post(request, post):
+    page = blog.find_post_page(unquote(post))
 
+    if page is not None:
+        return respond(request, page, HTML_CONTENT_TYPE)
+    return html(render_post(None), status=404)
 
-@app.route("/blog/tag/<tag>", name="tag")
-async def blog_tag(_, tag):
-    posts = blog.find_posts_by_tag(unquote(tag))
 
-    return html(
-        (
-            jinja_env.get_template("blog-tag.jinja").render(
-                public_url=transformed_public_url, posts=posts, tag=tag
-            )
-        ),
-        status=200 if len(posts) > 0 else 404,
-    )
+@app.route(f"{TAG_ROUTE_PARTIAL}/<tag>", name="tag")
+async def blog_tag(request, tag):
+    page = blog.find_tag_page(unquote(tag))
+
+    if page is not None:
+        return respond(request, page, HTML_CONTENT_TYPE)
+    return html(render_tag(tag, ()), status=404)
 
 
 @app.route(RSS_ROUTE, name="rss")
-async def blog_rss(_):
-    return text(blog.rss, headers={"Content-Type": "text/xml"})
+async def blog_rss(request):
+    return respond(request, blog.rss, RSS_CONTENT_TYPE)
+
+
+@app.route(ATOM_ROUTE, name="atom")
+async def blog_atom(request):
+    return respond(request, blog.atom, ATOM_CONTENT_TYPE)
+
+
+@app.route(JSON_FEED_ROUTE, name="json_feed")
+async def blog_json_feed(request):
+    return respond(request, blog.json_feed, JSON_FEED_CONTENT_TYPE)
+
+
+# Bridges are refreshed in the background, reading their data never blocks
+scheduler = Scheduler()
+if github is not None and not github.disable_fetch:
+    scheduler.add("github", github)
+if spotify is not None and not spotify.disable_fetch:
+    scheduler.add("spotify", spotify)
+
+
+if enable_metrics:
+
+    @app.route(METRICS_ROUTE, name="metrics")
+    async def metrics(request):
+        return raw(
+            expose(blog, scheduler, request_durations).encode(),
+            content_type=METRICS_CONTENT_TYPE,
+        )
+
+
+@app.before_server_start
+async def start_scheduler(*_):
+    scheduler.start()
+
+
+@app.before_server_stop
+async def stop_scheduler(*_):
+    scheduler.stop()
+
+
+@app.before_server_start
+async def handle_reload(_, loop):
+    # Rendering blocks, and therefore happens outside of the event loop
+    loop.add_signal_handler(
+        SIGHUP, lambda: loop.run_in_executor(None, reload_templates)
+    )
 
 
-try:
-    app.run(host=address, port=port, debug=debug, single_process=True)
-except KeyboardInterrupt:
-    app.stop()
+# `export.py` imports this module to reuse the blog, bridges, and templates
+if __name__ == "__main__":
+    try:
+        app.run(host=address, port=port, debug=debug, single_process=True)
+    except KeyboardInterrupt:
+        app.stop()
@@ -0,0 +1,4 @@
+from .measure import measure
+from .measure import Measurement
+
+__all__ = ["measure", "Measurement"]
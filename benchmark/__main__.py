@@ -0,0 +1,65 @@
+# Times the blog pipeline and every route of the app (`python3 -m benchmark`),
+# optionally comparing against the results of a previous run
+from argparse import ArgumentParser
+from pathlib import Path
+
+from . import pipeline
+from . import report
+from . import routes
+from .measure import ROUNDS
+from bridges.blog.util import info
+from bridges.blog.util import warning
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark the blog pipeline and routes")
+    parser.add_argument(
+        "--blog", type=Path, default=Path("blog"), help="blog that is benchmarked"
+    )
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="rounds per run")
+    parser.add_argument(
+        "--only",
+        choices=["pipeline", "routes"],
+        default=None,
+        help="only run one of the suites",
+    )
+    parser.add_argument("--output", type=Path, help="results are written here (JSON)")
+    parser.add_argument(
+        "--baseline", type=Path, help="results of a previous run to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=report.THRESHOLD,
+        help="slowdown (fraction of the baseline median) considered a regression",
+    )
+    arguments = parser.parse_args()
+
+    posts = sum(1 for path in (arguments.blog / "post").iterdir() if path.is_dir())
+    info(f"Benchmarking {posts} post folder(s) of {arguments.blog}")
+
+    measurements = []
+    if arguments.only in (None, "pipeline"):
+        measurements += pipeline.run(arguments.blog, arguments.rounds)
+    if arguments.only in (None, "routes"):
+        measurements += routes.run(arguments.blog, arguments.rounds)
+
+    for measurement in measurements:
+        print(measurement.summary())
+
+    if arguments.output is not None:
+        report.write(arguments.output, measurements, posts)
+
+    if arguments.baseline is not None:
+        baseline = report.load(arguments.baseline)
+        if baseline is None:
+            raise SystemExit(2)
+
+        regressions = report.compare(measurements, baseline, arguments.threshold)
+        if len(regressions) > 0:
+            warning(f"{len(regressions)} benchmark(s) regressed")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
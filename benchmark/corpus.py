@@ -0,0 +1,248 @@
+# Generates a synthetic blog (`python3 -m benchmark.corpus ./corpus --posts 1000`),
+# posts use every construct real posts do, so that they're rendered (and profiled)
+# the same way
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timedelta
+from json import dumps
+from json import loads
+from pathlib import Path
+from random import Random
+from shutil import rmtree
+from struct import pack
+from typing import List
+from zlib import compress
+from zlib import crc32
+
+from bridges.blog.constant import BLOG_METADATA
+from bridges.blog.constant import BLOG_TEXT
+from bridges.blog.constant import CONTENT_FOLDER
+from bridges.blog.util import info
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute "
+    "irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur"
+).split()
+TAGS = (
+    "python rust swift web linux macos music photography hardware networking "
+    "security databases compilers typography travel"
+).split()
+SECTIONS = ["Tech", "Music", "Life"]
+TEXT_LICENSES = ["by", "by-sa", "by-nc-sa", "by-nc-nd"]
+CODE_LICENSES = ["mit", "gpl-v3", "unlicense"]
+
+SNIPPETS = {
+    "python": 'def greet(name: str) -> str:\n    return f"Hello {name}"\n',
+    "javascript": "const greet = (name) => `Hello ${name}`;\nconsole.log(greet(1));\n",
+    "rust": 'fn main() {\n    let name = "world";\n    println!("Hello {}", name);\n}\n',
+    "bash": 'for file in *.md; do\n    wc -w "$file"\ndone\n',
+    "json": '{\n  "name": "corpus",\n  "posts": [1, 2, 3]\n}\n',
+    "": "plain text without a language identifier\n",
+}
+
+POSTS = 100
+SECTIONS_PER_POST = (3, 8)
+IMAGES_PER_POST = 2
+# Large enough to be resized by the image pipeline
+IMAGE_SIZE = (1600, 900)
+FIRST_DATE = datetime(2015, 1, 1, 12)
+
+
+def _png(width: int, height: int, color: bytes) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return pack(">I", len(data)) + kind + data + pack(">I", crc32(kind + data))
+
+    rows = b"".join(b"\0" + color * width for _ in range(height))
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            chunk(b"IDAT", compress(rows, 9)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+def _words(random: Random, minimum: int, maximum: int) -> str:
+    return " ".join(random.choices(WORDS, k=random.randint(minimum, maximum)))  # nosec
+
+
+def _paragraph(random: Random) -> str:
+    sentences = [
+        _words(random, 6, 18).capitalize() + "."
+        for _ in range(random.randint(2, 6))  # nosec
+    ]
+    # Emphasis, inline code and links
+    sentences.append(
+        f"This is *{random.choice(WORDS)}*, `{random.choice(WORDS)}()` and a "  # nosec
+        f"[link](https://example.com/{random.choice(WORDS)})."  # nosec
+    )
+    return " ".join(sentences)
+
+
+def _section(random: Random, images: List[str], footnote: int) -> str:
+    parts = [f"## {_words(random, 2, 5).capitalize()}", _paragraph(random)]
+
+    language = random.choice(list(SNIPPETS))  # nosec
+    parts.append(f"```{language}\n{SNIPPETS[language]}```")
+
+    if images:
+        parts.append(f"![{_words(random, 2, 4)}]({images.pop()})")
+
+    kind = random.randrange(3)  # nosec
+    if kind == 0:
+        parts.append(
+            "<details><summary>{}</summary>{}</details>".format(
+                _words(random, 2, 4), _paragraph(random)
+            )
+        )
+    elif kind == 1:
+        rows = ["| key | value | note |", "|---|---|---|"] + [
+            f"| {random.choice(WORDS)} | {random.randint(0, 999)} | "  # nosec
+            f"{_words(random, 1, 4)} |"
+            for _ in range(random.randint(2, 6))  # nosec
+        ]
+        parts.append("\n".join(rows))
+    else:
+        parts.append(
+            "\n".join(
+                f"- {_words(random, 3, 8)}"
+                for _ in range(random.randint(2, 5))  # nosec
+            )
+        )
+
+    parts.append(f"{_paragraph(random)}[^{footnote}]")
+    return "\n\n".join(parts)
+
+
+def text(random: Random, title: str, images: List[str]) -> str:
+    sections = random.randint(*SECTIONS_PER_POST)  # nosec
+    images = list(images)
+
+    return "\n\n".join(
+        [f"# {title}", _paragraph(random)]
+        + [_section(random, images, footnote) for footnote in range(1, sections + 1)]
+        + [
+            f"[^{footnote}]: {_words(random, 3, 8)}"
+            for footnote in range(1, sections + 1)
+        ]
+    )
+
+
+def metadata(random: Random, date: datetime) -> str:
+    return dumps(
+        {
+            "description": _words(random, 8, 20).capitalize() + ".",
+            "section": random.choice(SECTIONS),  # nosec
+            "tags": random.sample(TAGS, random.randint(1, 4)),  # nosec
+            "author": "author@example.com",
+            "date": date.isoformat(),
+            "license": {
+                "text": random.choice(TEXT_LICENSES),  # nosec
+                "code": random.choice(CODE_LICENSES),  # nosec
+            },
+            "read_time_hint": {"excluded_tags": ["pre"]},
+            # A few posts are hidden, as some real posts are
+            "hidden": random.random() < 0.05,  # nosec
+        },
+        indent=2,
+    )
+
+
+def write_post(path: Path, random: Random, index: int, images: int) -> None:
+    content = path / CONTENT_FOLDER
+    content.mkdir(parents=True, exist_ok=True)
+
+    names = []
+    for image in range(images):
+        name = f"image-{image}.png"
+        color = bytes(random.randrange(256) for _ in range(3))  # nosec
+        (content / name).write_bytes(_png(*IMAGE_SIZE, color))
+        names.append(name)
+
+    (path / BLOG_TEXT).write_text(
+        text(random, f"Post {index}: {_words(random, 2, 6)}", names)
+    )
+    (path / BLOG_METADATA).write_text(
+        metadata(random, FIRST_DATE + timedelta(days=index))
+    )
+
+
+def generate(
+    path: Path, posts: int, seed: int = 0, images: int = IMAGES_PER_POST
+) -> None:
+    random = Random(seed)  # nosec
+
+    for index in range(posts):
+        write_post(path / "post" / f"post-{index:05}", random, index, images)
+
+
+@dataclass(frozen=True)
+class Mutation:
+    # `edit`, `add` or `remove`
+    kind: str
+    # Name of the affected post
+    name: str
+
+
+# Picks a change to the corpus the way authors make them (editing, publishing and
+# removing posts)
+def plan(path: Path, random: Random) -> Mutation:
+    posts = sorted(folder for folder in (path / "post").iterdir() if folder.is_dir())
+    kind = random.choices(["edit", "add", "remove"], [8, 1, 1])[0]  # nosec
+
+    if kind == "add" or len(posts) <= 1:
+        index = max((int(post.name.split("-")[-1]) for post in posts), default=-1) + 1
+        return Mutation("add", f"post-{index:05}")
+
+    return Mutation(kind, random.choice(posts).name)  # nosec
+
+
+# Every post is left in a valid state
+def apply(path: Path, mutation: Mutation, random: Random) -> None:
+    post = path / "post" / mutation.name
+
+    if mutation.kind == "add":
+        write_post(post, random, int(mutation.name.split("-")[-1]), 0)
+    elif mutation.kind == "remove":
+        rmtree(post)
+    else:
+        with open(post / BLOG_TEXT, "a") as file:
+            file.write(f"\n\n{_paragraph(random)}\n")
+
+        # Tags are changed every once in a while, which affects tag pages
+        if random.random() < 0.2:  # nosec
+            metadata_ = loads((post / BLOG_METADATA).read_text())
+            metadata_["tags"] = random.sample(TAGS, random.randint(1, 4))  # nosec
+            (post / BLOG_METADATA).write_text(dumps(metadata_, indent=2))
+
+
+def mutate(path: Path, random: Random) -> Mutation:
+    mutation = plan(path, random)
+    apply(path, mutation, random)
+    return mutation
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Generate a synthetic blog")
+    parser.add_argument("target", type=Path, help="blog directory (`PT_BLOG_PATH`)")
+    parser.add_argument("--posts", type=int, default=POSTS, help="number of posts")
+    parser.add_argument(
+        "--images", type=int, default=IMAGES_PER_POST, help="images per post"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generator")
+    arguments = parser.parse_args()
+
+    if (arguments.target / "post").exists():
+        raise SystemExit(f"{arguments.target / 'post'} already exists")
+
+    generate(arguments.target, arguments.posts, arguments.seed, arguments.images)
+    info(f"Generated {arguments.posts} post(s) in {arguments.target}")
+
+
+if __name__ == "__main__":
+    main()
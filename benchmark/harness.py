@@ -0,0 +1,464 @@
+# Load tests the app (`python3 -m benchmark.harness --posts 1000`): a server is
+# started against a (generated or copied) corpus and driven by concurrent clients,
+# once with a static corpus and once while the corpus is being mutated
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+from json import dumps
+from json import loads
+from math import ceil
+from os import environ
+from pathlib import Path
+from random import Random
+from shutil import copytree
+from socket import socket
+from subprocess import DEVNULL  # nosec
+from subprocess import Popen  # nosec
+from subprocess import STDOUT  # nosec
+from sys import executable
+from tempfile import TemporaryDirectory
+from threading import Event
+from threading import Lock
+from threading import Thread
+from time import perf_counter
+from time import sleep
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from requests import RequestException
+from requests import Session
+
+from . import corpus
+from .report import environment
+from bridges.blog.constant import BLOG_METADATA
+from bridges.blog.util import info
+from bridges.blog.util import warning
+
+# Mirrors the routes of `app.py`, which isn't imported (the app runs in a
+# separate process)
+POST_ROUTE = "/blog/post/{}"
+TAG_ROUTE = "/blog/tag/{}"
+FEED_ROUTES = {"rss": "/blog/rss", "atom": "/blog/atom", "json_feed": "/blog/json"}
+# Relative share of requests per route
+WEIGHTS = {"home": 2, "post": 10, "tag": 3, "rss": 1, "atom": 1, "json_feed": 1}
+
+CONCURRENCY = 16
+REQUESTS = 2000
+WARMUP = 200
+# Seconds between mutations of the corpus
+MUTATION_INTERVAL = 1.0
+# Debounce delay of the served blog, lower than the app default to mostly
+# measure the refresh itself
+REFRESH_DELAY = 0.05
+STARTUP_TIMEOUT = 120.0
+REFRESH_TIMEOUT = 30.0
+POLL_INTERVAL = 0.01
+REQUEST_TIMEOUT = 30.0
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+# Nearest-rank percentile
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, ceil(fraction * len(ordered)) - 1)]
+
+
+@dataclass(frozen=True)
+class Latency:
+    name: str
+    requests: int
+    errors: int
+    # Responses other than 2xx and 304 (e.g. removed posts), which aren't timed
+    missing: int
+    p50: float
+    p95: float
+    p99: float
+
+    @staticmethod
+    def of(
+        name: str, samples: Sequence[float], errors: int, missing: int = 0
+    ) -> "Latency":
+        if len(samples) == 0:
+            return Latency(name, 0, errors, missing, 0.0, 0.0, 0.0)
+
+        p50, p95, p99 = (percentile(samples, fraction) for fraction in PERCENTILES)
+        return Latency(name, len(samples), errors, missing, p50, p95, p99)
+
+    def summary(self) -> str:
+        return (
+            "{:<28} {:>6} req {:>4} err {:>4} miss {:>10.3f} {:>10.3f} {:>10.3f} ms"
+        ).format(
+            self.name,
+            self.requests,
+            self.errors,
+            self.missing,
+            self.p50 * 1000,
+            self.p95 * 1000,
+            self.p99 * 1000,
+        )
+
+
+def _hidden(post: Path) -> bool:
+    try:
+        return bool(loads((post / BLOG_METADATA).read_text()).get("hidden", False))
+    except (OSError, ValueError):
+        return True
+
+
+# Paths per route, determined from the corpus itself
+def _targets(blog_path: Path) -> Dict[str, List[str]]:
+    posts = [
+        post
+        for post in sorted((blog_path / "post").iterdir())
+        if post.is_dir() and not _hidden(post)
+    ]
+    tags = sorted(
+        {
+            tag
+            for post in posts
+            for tag in loads((post / BLOG_METADATA).read_text()).get("tags", [])
+        }
+    )
+
+    targets = {
+        "home": ["/"],
+        "post": [POST_ROUTE.format(post.name) for post in posts],
+        "tag": [TAG_ROUTE.format(tag) for tag in tags],
+    }
+    targets.update({name: [route] for name, route in FEED_ROUTES.items()})
+
+    return {name: paths for name, paths in targets.items() if len(paths) > 0}
+
+
+def _free_port() -> int:
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+# Runs `app.py` of this checkout, regardless of the working directory
+APP_PATH = Path(__file__).parent.parent / "app.py"
+
+
+@contextmanager
+def serve(blog_path: Path, refresh_delay: float, log_path: Path) -> Iterator[str]:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+
+    env = dict(environ)
+    env.update(
+        {
+            "PT_ADDRESS": "127.0.0.1",
+            "PT_PORT": str(port),
+            "PT_FQ_URL": url,
+            "PT_BLOG_PATH": str(blog_path),
+            "PT_BLOG_REFRESH_DELAY": str(refresh_delay),
+            "PT_BLOG_IMAGE_PATH": str(log_path.parent / "image"),
+            "PT_ENABLE_GITHUB": "False",
+            "PT_ENABLE_SPOTIFY": "False",
+        }
+    )
+
+    with open(log_path, "wb") as log:
+        process = Popen(  # nosec
+            [executable, str(APP_PATH)],
+            cwd=APP_PATH.parent,
+            env=env,
+            stdin=DEVNULL,
+            stdout=log,
+            stderr=STDOUT,
+        )
+
+        try:
+            start = perf_counter()
+            with Session() as session:
+                while True:
+                    if process.poll() is not None:
+                        raise SystemExit(f"app exited, see {log_path}")
+                    if perf_counter() - start > STARTUP_TIMEOUT:
+                        raise SystemExit(f"app did not start in time, see {log_path}")
+
+                    try:
+                        if session.get(url, timeout=REQUEST_TIMEOUT).ok:
+                            break
+                    except RequestException:
+                        pass
+
+                    sleep(0.1)
+
+            info(f"App started in {perf_counter() - start:.2f}s on {url}")
+            yield url
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def drive(
+    url: str,
+    targets: Dict[str, List[str]],
+    requests: int,
+    concurrency: int,
+    random: Random,
+) -> Dict[str, Tuple[List[float], int, int]]:
+    names = list(targets)
+    plan = iter(
+        [
+            (name, random.choice(targets[name]))  # nosec
+            for name in random.choices(  # nosec
+                names, [WEIGHTS.get(name, 1) for name in names], k=requests
+            )
+        ]
+    )
+
+    lock = Lock()
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    missing = {name: 0 for name in names}
+
+    def worker() -> None:
+        with Session() as session:
+            while True:
+                with lock:
+                    name, path = next(plan, (None, ""))
+                if name is None:
+                    return
+
+                start = perf_counter()
+                try:
+                    status = session.get(
+                        url + path, timeout=REQUEST_TIMEOUT
+                    ).status_code
+                except RequestException:
+                    status = None
+                elapsed = perf_counter() - start
+
+                with lock:
+                    if status is None or status >= 500:
+                        errors[name] += 1
+                    # Removed posts are expected to be missing, responding with a
+                    # 404 is far cheaper than rendering them and would skew latencies
+                    elif not (200 <= status < 300 or status == 304):
+                        missing[name] += 1
+                    else:
+                        samples[name].append(elapsed)
+
+    threads = [Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {name: (samples[name], errors[name], missing[name]) for name in names}
+
+
+# Seconds between a mutation and it being served, or `None` if it never is
+def _visible(
+    session: Session, url: str, mutation: corpus.Mutation, before: Optional[str]
+) -> Optional[float]:
+    start = perf_counter()
+
+    while perf_counter() - start < REFRESH_TIMEOUT:
+        try:
+            response = session.get(
+                url + POST_ROUTE.format(mutation.name), timeout=REQUEST_TIMEOUT
+            )
+        except RequestException:
+            sleep(POLL_INTERVAL)
+            continue
+
+        if mutation.kind == "add":
+            visible = response.status_code == 200
+        elif mutation.kind == "remove":
+            visible = response.status_code == 404
+        else:
+            visible = response.headers.get("ETag", None) != before
+
+        if visible:
+            return perf_counter() - start
+
+        sleep(POLL_INTERVAL)
+
+    return None
+
+
+def mutate(
+    url: str, blog_path: Path, interval: float, random: Random, stop: Event
+) -> Tuple[List[float], int]:
+    refreshes = []
+    missed = 0
+
+    with Session() as session:
+        while not stop.wait(interval):
+            mutation = corpus.plan(blog_path, random)
+            post = blog_path / "post" / mutation.name
+
+            # Hidden posts are never served, their changes can't be observed
+            if mutation.kind != "add" and _hidden(post):
+                continue
+
+            before = None
+            if mutation.kind == "edit":
+                try:
+                    before = session.get(
+                        url + POST_ROUTE.format(mutation.name),
+                        timeout=REQUEST_TIMEOUT,
+                    ).headers.get("ETag", None)
+                except RequestException:
+                    continue
+
+            corpus.apply(blog_path, mutation, random)
+            if mutation.kind == "add" and _hidden(post):
+                continue
+
+            elapsed = _visible(session, url, mutation, before)
+            if elapsed is None:
+                warning(f"{mutation.kind} of {mutation.name} was never served")
+                missed += 1
+            else:
+                refreshes.append(elapsed)
+
+    return refreshes, missed
+
+
+def _latencies(
+    phase: str, results: Dict[str, Tuple[List[float], int, int]]
+) -> List[Latency]:
+    latencies = [
+        Latency.of(f"{phase}.{name}", samples, errors, missing)
+        for name, (samples, errors, missing) in results.items()
+    ]
+    latencies.append(
+        Latency.of(
+            f"{phase}.all",
+            [sample for samples, _, _ in results.values() for sample in samples],
+            sum(errors for _, errors, _ in results.values()),
+            sum(missing for _, _, missing in results.values()),
+        )
+    )
+    return latencies
+
+
+def run(
+    blog_path: Path,
+    requests: int,
+    concurrency: int,
+    interval: float,
+    refresh_delay: float,
+    seed: int,
+) -> Tuple[List[Latency], Latency, int]:
+    random = Random(seed)  # nosec
+
+    # Kept out of the blog, which is watched
+    with serve(blog_path, refresh_delay, blog_path.parent / "app.log") as url:
+        targets = _targets(blog_path)
+        info(
+            f"Driving {sum(map(len, targets.values()))} path(s) ({concurrency} clients)"
+        )
+
+        # Warms up the server (templates, compressed variants, connections)
+        drive(url, targets, WARMUP, concurrency, random)
+
+        latencies = _latencies(
+            "static", drive(url, targets, requests, concurrency, random)
+        )
+
+        stop = Event()
+        outcome: List[Tuple[List[float], int]] = []
+        mutator = Thread(
+            target=lambda: outcome.append(
+                mutate(url, blog_path, interval, Random(seed), stop)  # nosec
+            )
+        )
+        mutator.start()
+        try:
+            latencies += _latencies(
+                "mutating", drive(url, targets, requests, concurrency, random)
+            )
+        finally:
+            stop.set()
+            mutator.join()
+
+    refreshes, missed = outcome[0]
+    return latencies, Latency.of("refresh", refreshes, missed), len(refreshes)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Load test the app")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--blog", type=Path, help="blog that is served (copied)")
+    source.add_argument(
+        "--posts",
+        type=int,
+        default=corpus.POSTS,
+        help="size of the generated corpus (if no blog is given)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generator")
+    parser.add_argument(
+        "--requests", type=int, default=REQUESTS, help="requests per phase"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=CONCURRENCY, help="concurrent clients"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=MUTATION_INTERVAL,
+        help="seconds between mutations of the corpus",
+    )
+    parser.add_argument(
+        "--refresh-delay",
+        type=float,
+        default=REFRESH_DELAY,
+        help="debounce delay of the served blog",
+    )
+    parser.add_argument("--output", type=Path, help="results are written here (JSON)")
+    arguments = parser.parse_args()
+
+    # The corpus is mutated, which is never done to the original
+    with TemporaryDirectory() as directory:
+        blog_path = Path(directory) / "blog"
+
+        if arguments.blog is not None:
+            copytree(arguments.blog, blog_path)
+        else:
+            corpus.generate(blog_path, arguments.posts, arguments.seed)
+            info(f"Generated {arguments.posts} post(s)")
+
+        latencies, refresh, refreshes = run(
+            blog_path,
+            arguments.requests,
+            arguments.concurrency,
+            arguments.interval,
+            arguments.refresh_delay,
+            arguments.seed,
+        )
+
+    print("{:<58} {:>10} {:>10} {:>10}".format("", "p50", "p95", "p99"))
+    for latency in latencies:
+        print(latency.summary())
+    print(refresh.summary())
+
+    if arguments.output is not None:
+        arguments.output.write_text(
+            dumps(
+                {
+                    "environment": environment(),
+                    "concurrency": arguments.concurrency,
+                    "refresh_delay": arguments.refresh_delay,
+                    "results": {
+                        latency.name: asdict(latency)
+                        for latency in latencies + [refresh]
+                    },
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
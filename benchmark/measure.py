@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from statistics import mean
+from statistics import median
+from statistics import stdev
+from time import perf_counter
+from typing import Callable
+from typing import Optional
+
+# Rounds of a benchmark are repeated calls that take at least this many seconds
+# (unless the benchmark requires a setup before every call), timer resolution
+# would dominate shorter rounds
+MINIMUM_ROUND = 0.01
+ROUNDS = 20
+WARMUP = 1
+
+
+@dataclass(frozen=True)
+class Measurement:
+    name: str
+    # Seconds per call
+    median: float
+    mean: float
+    minimum: float
+    deviation: float
+    rounds: int
+    calls: int
+
+    def summary(self) -> str:
+        return "{:<36} {:>10.3f} ms ± {:.3f} ms ({}×{})".format(
+            self.name,
+            self.median * 1000,
+            self.deviation * 1000,
+            self.rounds,
+            self.calls,
+        )
+
+
+def _calls(function: Callable[[], object]) -> int:
+    calls = 1
+
+    while True:
+        start = perf_counter()
+        for _ in range(calls):
+            function()
+        if perf_counter() - start >= MINIMUM_ROUND or calls >= 1 << 20:
+            return calls
+        calls *= 2
+
+
+def measure(
+    name: str,
+    function: Callable[[], object],
+    # Called (untimed) before every call of `function`, e.g. to clear caches
+    setup: Optional[Callable[[], object]] = None,
+    rounds: int = ROUNDS,
+) -> Measurement:
+    for _ in range(WARMUP):
+        if setup is not None:
+            setup()
+        function()
+
+    calls = 1 if setup is not None else _calls(function)
+
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+
+        start = perf_counter()
+        for _ in range(calls):
+            function()
+        samples.append((perf_counter() - start) / calls)
+
+    return Measurement(
+        name,
+        median(samples),
+        mean(samples),
+        min(samples),
+        stdev(samples) if len(samples) > 1 else 0.0,
+        rounds,
+        calls,
+    )
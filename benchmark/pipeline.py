@@ -0,0 +1,138 @@
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import List
+
+from result import Ok
+
+from .measure import measure
+from .measure import Measurement
+from bridges.blog import Blog
+from bridges.blog.container import Post
+from bridges.blog.feed import build_entry
+from bridges.blog.feed import FeedMetadata
+from bridges.blog.feed.rss import build_feed
+from bridges.blog.feed.rss import serialize_item
+from bridges.blog.load import load_all
+from bridges.blog.markdown import render as render_markdown
+from bridges.blog.read_time import ReadTime
+from bridges.blog.util import Url
+
+BASE_STATIC_URL = Url("/static/blog/post")
+BASE_URL = Url("http://localhost/blog/post")
+FEED_URL = Url("http://localhost/blog")
+
+
+def _clear_markdown() -> None:
+    render_markdown.cache_clear()
+
+
+# Every benchmark processes all posts of the blog at `blog_path` at once, stages
+# involving Markdown are measured with a cold cache (as they are whenever a post
+# changed)
+def run(blog_path: Path, rounds: int) -> List[Measurement]:
+    folders = sorted(
+        folder for folder in (blog_path / "post").iterdir() if folder.is_dir()
+    )
+
+    sentinels = [
+        sentinel.ok()
+        for sentinel in (Post.valid(folder) for folder in folders)
+        if isinstance(sentinel, Ok)
+    ]
+    posts = [Post.new(sentinel) for sentinel in sentinels]
+    rendered = [post.render(BASE_STATIC_URL) for post in posts]
+    html = [render_markdown(post.content) for post in posts]
+
+    feed_metadata = FeedMetadata(
+        "Benchmark",
+        "",
+        "en",
+        BASE_URL,
+        FEED_URL / "rss",
+        FEED_URL / "atom",
+        FEED_URL / "json",
+    )
+    items = [
+        serialize_item(post, rendered_, BASE_URL)
+        for post, rendered_ in zip(posts, rendered)
+    ]
+    now = datetime.now(timezone.utc)
+
+    measurements = [
+        measure(
+            "post.valid",
+            lambda: [Post.valid(folder) for folder in folders],
+            rounds=rounds,
+        ),
+        measure(
+            "post.new",
+            lambda: [Post.new(sentinel) for sentinel in sentinels],
+            _clear_markdown,
+            rounds,
+        ),
+        measure(
+            "post.render",
+            lambda: [post.render(BASE_STATIC_URL) for post in posts],
+            _clear_markdown,
+            rounds,
+        ),
+        measure(
+            "read_time",
+            lambda: [
+                ReadTime(html_, post.metadata.read_time_hint.into())
+                for post, html_ in zip(posts, html)
+            ],
+            rounds=rounds,
+        ),
+        measure(
+            "markdown.render.cold",
+            lambda: [render_markdown(post.content) for post in posts],
+            _clear_markdown,
+            rounds,
+        ),
+        measure(
+            "markdown.render.warm",
+            lambda: [render_markdown(post.content) for post in posts],
+            rounds=rounds,
+        ),
+        measure(
+            "feed.build_entry",
+            lambda: [
+                build_entry(post, rendered_, now, feed_metadata)
+                for post, rendered_ in zip(posts, rendered)
+            ],
+            rounds=rounds,
+        ),
+        measure(
+            "feed.rss.build_feed",
+            lambda: build_feed(items, feed_metadata, now),
+            rounds=rounds,
+        ),
+        measure(
+            "blog.load",
+            lambda: load_all(folders, BASE_STATIC_URL),
+            _clear_markdown,
+            rounds,
+        ),
+    ]
+
+    blog = Blog(
+        blog_path,
+        BASE_STATIC_URL,
+        feed_metadata.title,
+        feed_metadata.description,
+        feed_metadata.language,
+        BASE_URL,
+        feed_metadata.rss_url,
+        feed_metadata.atom_url,
+        feed_metadata.json_feed_url,
+    )
+    # Refreshes are only measured explicitly
+    blog.observer.stop()
+
+    return measurements + [
+        # Nothing changed, only the post folders are checked
+        measure("blog.refresh", blog.refresh, rounds=rounds),
+        measure("blog.rerender", blog.rerender, rounds=rounds),
+    ]
@@ -0,0 +1,95 @@
+from dataclasses import asdict
+from json import dumps
+from json import loads
+from pathlib import Path
+from platform import platform
+from platform import python_version
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from .measure import Measurement
+from bridges.blog.markdown import fingerprint
+from bridges.blog.util import info
+from bridges.blog.util import warning
+
+# Has to be incremented whenever the shape of results changes
+REPORT_VERSION = 1
+# Medians slower than the baseline by more than this fraction are regressions
+THRESHOLD = 0.1
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": python_version(),
+        "platform": platform(),
+        "markdown": fingerprint(),
+    }
+
+
+def write(path: Path, measurements: Sequence[Measurement], posts: int) -> None:
+    path.write_text(
+        dumps(
+            {
+                "version": REPORT_VERSION,
+                "environment": environment(),
+                "posts": posts,
+                "results": {
+                    measurement.name: asdict(measurement)
+                    for measurement in measurements
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+def load(path: Path) -> Optional[Dict[str, Dict[str, float]]]:
+    try:
+        report = loads(path.read_text())
+    except (OSError, ValueError) as e:
+        warning(f"could not read baseline {path}: {e!r}")
+        return None
+
+    if report.get("version", None) != REPORT_VERSION:
+        warning(f"baseline {path} was written by an incompatible version")
+        return None
+
+    # Results are only comparable if they were obtained under the same conditions
+    for key, value in environment().items():
+        if report["environment"].get(key, None) != value:
+            warning(f"baseline differs in {key}: {report['environment'].get(key)}")
+
+    return report["results"]  # type: ignore
+
+
+# Returns the names of regressed benchmarks
+def compare(
+    measurements: Sequence[Measurement],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = THRESHOLD,
+) -> List[str]:
+    regressions = []
+
+    for measurement in measurements:
+        previous = baseline.get(measurement.name, None)
+        if previous is None:
+            info(f"{measurement.name}: not part of the baseline")
+            continue
+
+        change = measurement.median / previous["median"] - 1
+        line = "{:<36} {:>10.3f} ms -> {:>10.3f} ms ({:+.1%})".format(
+            measurement.name,
+            previous["median"] * 1000,
+            measurement.median * 1000,
+            change,
+        )
+
+        if change > threshold:
+            warning(line)
+            regressions.append(measurement.name)
+        else:
+            info(line)
+
+    return regressions
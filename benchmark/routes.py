@@ -0,0 +1,109 @@
+from asyncio import new_event_loop
+from os import environ
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from .measure import measure
+from .measure import Measurement
+from bridges.blog.util import warning
+
+# The test client is only a development dependency
+try:
+    from httpx import ASGITransport
+    from httpx import AsyncClient
+    from sanic_testing.testing import SanicASGITestClient
+except ImportError:
+    SanicASGITestClient = None  # type: ignore
+
+# Seconds, a stalled request fails the benchmark instead of hanging it
+REQUEST_TIMEOUT = 30.0
+
+
+# Requests are handled in-process (through the ASGI interface of the app), no
+# sockets are involved
+def run(blog_path: Path, rounds: int) -> List[Measurement]:
+    if SanicASGITestClient is None:
+        warning("sanic-testing is not installed, skipping route benchmarks")
+        return []
+
+    # Configures the app, which is only imported afterwards
+    environ["PT_BLOG_PATH"] = str(blog_path)
+    environ["PT_ENABLE_GITHUB"] = "False"
+    environ["PT_ENABLE_SPOTIFY"] = "False"
+    import app as site
+
+    site.blog.observer.stop()
+
+    snapshot = site.blog.snapshot
+    post = next(iter(snapshot.visible_posts), None)
+    tag = next(iter(snapshot.visible_tags), None)
+
+    routes: Dict[str, Optional[str]] = {
+        "home": "/",
+        "post": f"/{site.RSS_POST_ROUTE_PARTIAL}/{post.name}" if post else None,
+        "post.missing": f"/{site.RSS_POST_ROUTE_PARTIAL}/missing",
+        "tag": f"/{site.TAG_ROUTE_PARTIAL}/{tag}" if tag else None,
+        "rss": f"/{site.RSS_ROUTE}",
+        "atom": f"/{site.ATOM_ROUTE}",
+        "json_feed": f"/{site.JSON_FEED_ROUTE}",
+    }
+
+    loop = new_event_loop()
+    client = SanicASGITestClient(site.app)
+    # The test client starts the app up for every request, which would dominate
+    # the measurement. The app is therefore only started by the first request
+    # (of every route), and requested through a plain ASGI client afterwards.
+    requests = AsyncClient(
+        transport=ASGITransport(app=site.app), base_url=client.base_url
+    )
+
+    def get(path: str, headers: Dict[str, str]) -> None:
+        loop.run_until_complete(
+            requests.get(path, headers=headers, timeout=REQUEST_TIMEOUT)
+        )
+
+    measurements = []
+    try:
+        for name, path in routes.items():
+            if path is None:
+                warning(f"blog has no visible {name}, skipping its route")
+                continue
+
+            _, response = loop.run_until_complete(
+                client.get(path, timeout=REQUEST_TIMEOUT)
+            )
+            etag = response.headers.get("ETag", None)
+
+            measurements.append(
+                measure(
+                    f"route.{name}",
+                    lambda path=path: get(path, {}),  # type: ignore
+                    rounds=rounds,
+                )
+            )
+            measurements.append(
+                measure(
+                    f"route.{name}.gzip",
+                    lambda path=path: get(  # type: ignore
+                        path, {"Accept-Encoding": "gzip"}
+                    ),
+                    rounds=rounds,
+                )
+            )
+            if etag is not None:
+                measurements.append(
+                    measure(
+                        f"route.{name}.not_modified",
+                        lambda path=path, etag=etag: get(  # type: ignore
+                            path, {"If-None-Match": etag}
+                        ),
+                        rounds=rounds,
+                    )
+                )
+    finally:
+        loop.run_until_complete(requests.aclose())
+        loop.close()
+
+    return measurements
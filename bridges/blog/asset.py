@@ -0,0 +1,147 @@
+from dataclasses import replace
+from hashlib import sha256
+from pathlib import Path
+from re import compile as re_compile
+from re import Match
+from threading import Lock
+from typing import Dict
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from urllib.parse import unquote
+
+from .container import Image
+from .util import Url
+
+# Static assets are referenced with the digest of their content in this query
+# argument, a modified asset is therefore always requested under a new URL
+VERSION_ARGUMENT = "v"
+VERSION_LENGTH = 16
+
+# Sent for versioned URLs (as long as the version is current), browsers never
+# revalidate them
+IMMUTABLE = f"public, max-age={365 * 24 * 60 * 60}, immutable"
+
+# URLs in `src`, `href` and `srcset` attributes of rendered posts
+URL_ATTRIBUTE = re_compile(r"""\b(src|href|srcset)="([^"]*)\"""")
+
+
+def file_version(path: Path) -> Optional[str]:
+    try:
+        return sha256(path.read_bytes()).hexdigest()[:VERSION_LENGTH]
+    except OSError:
+        return None
+
+
+def versioned(url: str, version: str) -> str:
+    return f"{url}?{VERSION_ARGUMENT}={version}"
+
+
+# Resolves `relative` (an unquoted URL path) within `root`, `None` if it points
+# outside of it
+def _resolve(root: Path, relative: str) -> Optional[Path]:
+    resolved = (root / unquote(relative)).resolve()
+
+    try:
+        resolved.relative_to(root.resolve())
+    except ValueError:
+        return None
+
+    return resolved
+
+
+# Maps static URLs to the versions of the files they're served from. Versions
+# are computed once per file and only recomputed once the file was modified.
+class Manifest:
+    def __init__(
+        self,
+        # URL prefixes and the directories they're served from
+        roots: Mapping[str, Path],
+    ) -> None:
+        self.roots = {prefix.rstrip("/"): path for prefix, path in roots.items()}
+
+        # Resolved path with (mtime in nanoseconds, size) of the file the version
+        # was computed for
+        self._versions: Dict[Path, Tuple[Tuple[int, int], str]] = {}
+        self._lock = Lock()
+
+    def _path(self, url: str) -> Optional[Path]:
+        for prefix, root in self.roots.items():
+            if url.startswith(f"{prefix}/"):
+                return _resolve(root, url[len(prefix) + 1 :])
+        return None
+
+    def version(self, url: str) -> Optional[str]:
+        path = self._path(url)
+        if path is None:
+            return None
+
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._versions.get(path, None)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        version = file_version(path)
+        if version is not None:
+            with self._lock:
+                self._versions[path] = (signature, version)
+        return version
+
+    # Used by templates, URLs not backed by a file are returned as is
+    def url(self, url: Union[Url, str]) -> str:
+        url = str(url)
+        version = self.version(url)
+        return versioned(url, version) if version is not None else url
+
+
+# Appends the version of every file of `content_path` that is referenced by the
+# HTML of a rendered post (files are served at `base_post_static_url`)
+def version_content(html: str, content_path: Path, base_post_static_url: Url) -> str:
+    prefix = f"{base_post_static_url}/"
+    versions: Dict[str, Optional[str]] = {}
+
+    def version(url: str) -> str:
+        if not url.startswith(prefix) or "?" in url:
+            return url
+
+        if url not in versions:
+            path = _resolve(content_path, url[len(prefix) :])
+            versions[url] = file_version(path) if path is not None else None
+
+        version_ = versions[url]
+        return versioned(url, version_) if version_ is not None else url
+
+    def rewrite(match: "Match[str]") -> str:
+        name, value = match.group(1), match.group(2)
+
+        if name == "srcset":
+            value = ", ".join(
+                " ".join([version(url), *descriptor])
+                for url, *descriptor in (
+                    candidate.strip().split(" ") for candidate in value.split(",")
+                )
+            )
+        else:
+            value = version(value)
+
+        return f'{name}="{value}"'
+
+    return URL_ATTRIBUTE.sub(rewrite, html)
+
+
+def version_image(image: Image, content_path: Path, base_post_static_url: Url) -> Image:
+    prefix = f"{base_post_static_url}/"
+    url = str(image.url)
+    if not url.startswith(prefix) or "?" in url:
+        return image
+
+    path = _resolve(content_path, url[len(prefix) :])
+    version = file_version(path) if path is not None else None
+    return replace(image, url=Url(versioned(url, version))) if version else image
@@ -1,52 +1,63 @@
 from __future__ import annotations
 
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from datetime import datetime
+from datetime import timezone
 from pathlib import Path
 from threading import Lock
+from time import perf_counter
 from typing import Any
 from typing import Callable
+from typing import Iterable
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
-from result import Ok
-from rfeed import Feed
 from watchdog.events import FileSystemEventHandler as WatchdogFileSystemEventHandler
 from watchdog.observers import Observer
 
+from .cache import Cache
+from .debounce import Debouncer
+from .image import ImagePipeline
+from .load import load_all
+from .load import Loaded
+from .load import Workers
+from .page import EPOCH
+from .page import http_date
+from .page import Page
+from .snapshot import freeze
+from .snapshot import Snapshot
 from .util import info
 from .util import Url
 from .util import warning
 from bridges.blog.container import Post
-from bridges.blog.rss import build_feed
-from bridges.blog.rss import FeedMetadata
-
-
-class RwLock:
-    def __init__(self) -> None:
-        self._count = 0
-        self._counter_lock = Lock()
-        self._write_lock = Lock()
-
-    def read_acquire(self) -> None:
-        self._counter_lock.acquire()
-        self._count += 1
-
-        if self._count == 1:
-            self._write_lock.acquire()
-
-        self._counter_lock.release()
-
-    def read_release(self) -> None:
-        self._counter_lock.acquire()
-        self._count -= 1
-
-        if self._count == 0:
-            self._write_lock.release()
-
-        self._counter_lock.release()
-
-    def write_acquire(self) -> None:
-        self._write_lock.acquire()
-
-    def write_release(self) -> None:
-        self._write_lock.release()
+from bridges.blog.feed import build_entry
+from bridges.blog.feed import build_feeds
+from bridges.blog.feed import FeedEntry
+from bridges.blog.feed import FeedMetadata
+from bridges.blog.feed import Feeds
+
+PostRenderer = Callable[[Post, Post._RenderedPost], str]
+TagRenderer = Callable[[str, Sequence[Post]], str]
+Listener = Callable[[Snapshot], None]
+
+
+@dataclass(frozen=True)
+class RefreshStats:
+    # Includes refreshes that failed and re-renders
+    refreshes: int = 0
+    # Seconds spent refreshing, in total and during the last refresh
+    duration: float = 0.0
+    last_duration: float = 0.0
+    # Post folders loaded by every refresh so far, by origin (`unchanged`,
+    # `cache` or `built`)
+    loaded: Mapping[str, int] = field(default_factory=lambda: freeze({}))
+    # Post folders that currently fail to load, by kind of fault
+    failures: Mapping[str, int] = field(default_factory=lambda: freeze({}))
 
 
 class Blog:
@@ -66,6 +77,20 @@ class Blog:
         rss_language: str,
         rss_base_url: Url,
         rss_url: Url,
+        atom_url: Url,
+        json_feed_url: Url,
+        render_post: Optional[PostRenderer] = None,
+        render_tag: Optional[TagRenderer] = None,
+        refresh_delay: float = 0.5,
+        refresh_max_delay: float = 5.0,
+        # Number of processes posts are loaded with, `1` loads them serially
+        workers: int = 1,
+        # Built posts are persisted in and restored from this directory
+        cache_path: Optional[Path] = None,
+        # Maximum number of posts contained in the feeds, `None` for no limit
+        feed_limit: Optional[int] = None,
+        # Generates variants of the images referenced by posts (disabled if unset)
+        images: Optional[ImagePipeline] = None,
     ) -> None:
         self.base_path = base_path
         self.base_static_url = base_static_url
@@ -74,118 +99,380 @@ class Blog:
         self.rss_language = rss_language
         self.rss_base_url = rss_base_url
         self.rss_url = rss_url
+        self.atom_url = atom_url
+        self.json_feed_url = json_feed_url
+        self.render_post = render_post
+        self.render_tag = render_tag
+        self.workers = workers
+        self.feed_limit = feed_limit
+        self.images = images
+        self.cache = (
+            Cache(cache_path, base_static_url, images)
+            if cache_path is not None
+            else None
+        )
 
         self.post_path = base_path / "post"
 
+        # Created before the threads below are started (workers are forked)
+        self._workers = Workers(workers) if workers > 1 else None
+
+        # Bursts of file system events (e.g. `git pull`) only cause one refresh
+        self.debouncer = Debouncer(self.refresh, refresh_delay, refresh_max_delay)
+
         self.observer = Observer()
         self.observer.schedule(
-            Blog._FileSystemEventHandler(self.__refresh),
+            Blog._FileSystemEventHandler(self.debouncer.trigger),
             str(self.post_path.absolute()),
             recursive=True,
         )
 
-        self._posts: list[Post] = []
-        self._tags: dict[str, list[Post]] = {}
-        self._rss: str = ""
+        # Only ever replaced as a whole, reading the attribute once yields a
+        # consistent view without locking
+        self._snapshot = Snapshot()
+
+        # Only accessed by `refresh`, used to skip unchanged post folders
+        self._entries: dict[str, Loaded] = {}
 
-        self.lock = RwLock()
+        # Refreshes mutate `_entries` and must therefore never overlap
+        self._refresh_lock = Lock()
+        # Only accessed by `refresh`, published through `_stats`
+        self._loaded: Counter[str] = Counter()
+        self._failures: Counter[str] = Counter()
+        self._stats = RefreshStats()
+        # Called with every newly published snapshot
+        self._listeners: list[Listener] = []
 
-        self.__refresh()
+        self.refresh()
 
         self.observer.start()
 
+    @property
+    def snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    # Changes with every published snapshot
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation
+
+    # Replaced as a whole once a refresh finished
+    def stats(self) -> RefreshStats:
+        return self._stats
+
+    # Listeners are called from the thread that performed the refresh
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
     def find_post(self, name: str) -> Post | None:
-        post = None
+        return self._snapshot.post_index.get(name, None)
 
-        self.lock.read_acquire()
-        for post_ in self._posts:
-            if post_.name == name:
-                post = post_
-                break
-        self.lock.read_release()
+    # Hidden posts are excluded
+    def find_posts_by_tag(self, tag: str) -> Tuple[Post, ...]:
+        return self._snapshot.visible_tags.get(tag, ())
 
-        return post
+    def find_post_page(self, name: str) -> Page | None:
+        return self._snapshot.post_pages.get(name, None)
 
-    def find_posts_by_tag(self, tag: str) -> list[Post]:
-        posts = []
+    def find_tag_page(self, tag: str) -> Page | None:
+        return self._snapshot.tag_pages.get(tag, None)
 
-        self.lock.read_acquire()
-        for post_ in self._posts:
-            if tag in post_.metadata.tags:
-                posts.append(post_)
-        self.lock.read_release()
+    @property
+    def posts(self) -> Tuple[Post, ...]:
+        return self._snapshot.posts
 
-        return posts
+    @property
+    def visible_posts(self) -> Tuple[Post, ...]:
+        return self._snapshot.visible_posts
 
     @property
-    def posts(self) -> list[Post]:
-        self.lock.read_acquire()
-        posts = self._posts[:]
-        self.lock.read_release()
+    def tags(self) -> Mapping[str, Tuple[Post, ...]]:
+        return self._snapshot.tags
 
-        return posts
+    @property
+    def rss(self) -> Page:
+        return self._snapshot.rss
 
     @property
-    def tags(self) -> dict[str, list[Post]]:
-        self.lock.read_acquire()
-        tags = self._tags.copy()
-        self.lock.read_release()
+    def atom(self) -> Page:
+        return self._snapshot.atom
 
-        return tags
+    @property
+    def json_feed(self) -> Page:
+        return self._snapshot.json_feed
 
     @property
-    def rss(self) -> str:
-        self.lock.read_acquire()
-        rss = self._rss
-        self.lock.read_release()
-
-        return rss
-
-    def _build_feed(self, posts: list[Post]) -> Feed:
-        return build_feed(
-            posts,
-            FeedMetadata(
-                self.rss_title,
-                self.rss_url,
-                self.rss_description,
-                self.rss_language,
-                self.rss_base_url,
-                self.base_static_url,
-            ),
+    def feed_metadata(self) -> FeedMetadata:
+        return FeedMetadata(
+            self.rss_title,
+            self.rss_description,
+            self.rss_language,
+            self.rss_base_url,
+            self.rss_url,
+            self.atom_url,
+            self.json_feed_url,
         )
 
-    def __refresh(self) -> None:
+    # Entries of unchanged posts are reused, only changed posts and the feed
+    # headers are serialized
+    def _build_feeds(
+        self,
+        posts: Sequence[Post],
+        rendered: dict[str, Post._RenderedPost],
+        modified: dict[str, datetime],
+        changed: set[str],
+        updated: datetime,
+    ) -> Tuple[Feeds, dict[str, FeedEntry]]:
+        previous = self._snapshot.feed_entries
+        feed_metadata = self.feed_metadata
+
+        entries = {
+            post.name: previous[post.name]
+            if post.name not in changed and post.name in previous
+            else build_entry(
+                post, rendered[post.name], modified[post.name], feed_metadata
+            )
+            for post in posts
+        }
+
+        return build_feeds(list(entries.values()), feed_metadata, updated), entries
+
+    def _render_post_pages(
+        self,
+        posts: Sequence[Post],
+        rendered: dict[str, Post._RenderedPost],
+        modified: dict[str, datetime],
+        changed: set[str],
+    ) -> dict[str, Page]:
+        if self.render_post is None:
+            return {}
+
+        previous = self._snapshot.post_pages
+
+        return {
+            post.name: previous[post.name]
+            if post.name not in changed and post.name in previous
+            else Page.new(
+                self.render_post(post, rendered[post.name]).encode(),
+                modified[post.name],
+                previous.get(post.name, None),
+            )
+            for post in posts
+        }
+
+    def _render_tag_pages(
+        self,
+        tags: Mapping[str, Sequence[Post]],
+        modified: dict[str, datetime],
+        changed: set[str],
+    ) -> dict[str, Page]:
+        if self.render_tag is None:
+            return {}
+
+        previous = self._snapshot.tag_pages
+
+        return {
+            tag: previous[tag]
+            if tag not in changed and tag in previous
+            else Page.new(
+                self.render_tag(tag, posts).encode(),
+                Blog._newest(modified, posts),
+                previous.get(tag, None),
+            )
+            for tag, posts in tags.items()
+        }
+
+    # Posts are considered modified once they're published or their source files
+    # are touched, whichever happened last
+    @staticmethod
+    def _modified(entry: Loaded) -> datetime:
+        assert entry.post is not None  # nosec
+
+        dates = [entry.post.metadata.date]
+        if entry.source.signature is not None:
+            dates.extend(
+                datetime.fromtimestamp(stat[0] / 1e9, timezone.utc)
+                for _, stat in entry.source.signature
+                if stat is not None
+            )
+
+        return max(http_date(date) for date in dates)
+
+    @staticmethod
+    def _newest(modified: dict[str, datetime], posts: Iterable[Post]) -> datetime:
+        return max((modified[post.name] for post in posts), default=EPOCH)
+
+    @staticmethod
+    def _tags_of(entries: Iterable[Loaded | None]) -> set[str]:
+        return {
+            tag
+            for entry in entries
+            if entry is not None and entry.post is not None
+            for tag in entry.post.metadata.tags
+        }
+
+    @staticmethod
+    def _index_tags(posts: Sequence[Post]) -> Mapping[str, Tuple[Post, ...]]:
+        tags: dict[str, list[Post]] = {}
+
+        for post in posts:
+            for tag in post.metadata.tags:
+                if tag not in tags:
+                    tags[tag] = []
+                tags[tag].append(post)
+
+        return freeze({tag: tuple(posts) for tag, posts in tags.items()})
+
+    # Picks up modifications right away, refreshes are otherwise triggered by the
+    # file system observer
+    def refresh(self) -> None:
+        with self._refresh_lock:
+            self.__measure(False)
+
+    # Renders every page again (e.g. after templates were modified)
+    def rerender(self) -> None:
+        with self._refresh_lock:
+            self.__measure(True)
+
+    def __measure(self, rerender: bool) -> None:
+        start = perf_counter()
+
+        try:
+            self.__rebuild(rerender)
+        finally:
+            elapsed = perf_counter() - start
+            stats = self._stats
+
+            self._stats = RefreshStats(
+                stats.refreshes + 1,
+                stats.duration + elapsed,
+                elapsed,
+                freeze(dict(self._loaded)),
+                freeze(dict(self._failures)),
+            )
+
+    def __rebuild(self, rerender: bool = False) -> None:
         info("Refreshing!")
 
-        posts: list[Post] = []
-        tags: dict[str, list[Post]] = {}
+        entries: dict[str, Loaded] = {}
+        # Post folders that were added or modified
+        pending: list[Path] = []
 
         for folder in self.post_path.iterdir():
             if folder.is_dir():
-                sentinel = Post.valid(folder)
-                if isinstance(sentinel, Ok):
-                    post = Post.new(sentinel.ok())
+                previous = self._entries.get(folder.name, None)
+                source = (
+                    previous.source.unchanged(folder) if previous is not None else None
+                )
+
+                if previous is not None and source is not None:
+                    entries[folder.name] = replace(previous, source=source)
+                    self._loaded["unchanged"] += 1
+                else:
+                    pending.append(folder)
+
+        for folder, loaded in zip(
+            pending,
+            load_all(
+                pending, self.base_static_url, self._workers, self.cache, self.images
+            ),
+        ):
+            if loaded.failure is not None:
+                warning(f"{str(folder)}: {loaded.failure.description}")
+            entries[folder.name] = loaded
+            self._loaded["cache" if loaded.cached else "built"] += 1
+
+        self._failures = Counter(
+            entry.failure.kind
+            for entry in entries.values()
+            if entry.failure is not None
+        )
+
+        changed = {folder.name for folder in pending}
+        removed = self._entries.keys() - entries.keys()
+        # Includes tags a changed post was removed from
+        changed_tags = Blog._tags_of(
+            [self._entries.get(name, None) for name in changed | removed]
+            + [entries[name] for name in changed]
+        )
 
-                    for tag in post.metadata.tags:
-                        if tag not in tags:
-                            tags[tag] = []
-                        tags[tag].append(post)
+        if len(changed) == 0 and len(removed) == 0 and not rerender:
+            self._entries = entries
+            return
 
-                    posts.append(post)
-                else:
-                    warning(f"{str(folder)}: {sentinel.err().description}")
+        posts = [entry.post for entry in entries.values() if entry.post is not None]
 
         # https://github.com/python/mypy/issues/9656
-        sorted_posts = sorted(
-            posts,
-            key=lambda post: post.metadata.date.timestamp(),  # type: ignore
-            reverse=True,
+        sorted_posts = tuple(
+            sorted(
+                posts,
+                key=lambda post: post.metadata.date.timestamp(),  # type: ignore
+                reverse=True,
+            )
+        )
+
+        visible_posts = tuple(post for post in sorted_posts if not post.metadata.hidden)
+
+        # Built from the sorted posts so tag pages retain their order
+        tags = Blog._index_tags(sorted_posts)
+        visible_tags = Blog._index_tags(visible_posts)
+
+        rendered = {
+            entry.post.name: entry.rendered
+            for entry in entries.values()
+            if entry.post is not None and entry.rendered is not None
+        }
+        modified = {
+            entry.post.name: Blog._modified(entry)
+            for entry in entries.values()
+            if entry.post is not None
+        }
+        # Feeds only contain (the newest) visible posts
+        feed_posts = visible_posts[: self.feed_limit]
+        feed_modified = Blog._newest(modified, feed_posts)
+        feeds, feed_entries = self._build_feeds(
+            feed_posts, rendered, modified, changed, feed_modified
+        )
+
+        published = self._snapshot
+        self._snapshot = Snapshot(
+            sorted_posts,
+            visible_posts,
+            freeze({post.name: post for post in sorted_posts}),
+            tags,
+            visible_tags,
+            Page.new(feeds.rss.encode(), feed_modified, published.rss),
+            Page.new(feeds.atom.encode(), feed_modified, published.atom),
+            Page.new(feeds.json_feed.encode(), feed_modified, published.json_feed),
+            freeze(
+                self._render_post_pages(
+                    sorted_posts,
+                    rendered,
+                    modified,
+                    set(entries.keys()) if rerender else changed,
+                )
+            ),
+            freeze(
+                self._render_tag_pages(
+                    visible_tags,
+                    modified,
+                    set(visible_tags.keys()) if rerender else changed_tags,
+                )
+            ),
+            freeze(feed_entries),
+            published.generation + 1,
         )
 
-        self.lock.write_acquire()
+        # Only committed once the snapshot was published successfully, an
+        # exception will cause the affected folders to be reloaded next time
+        self._entries = entries
 
-        self._posts = sorted_posts
-        self._tags = tags
-        self._rss = self._build_feed(sorted_posts).rss()
+        if self.cache is not None:
+            self.cache.prune(
+                (name, entry.source.digest)
+                for name, entry in entries.items()
+                if entry.post is not None and entry.source.digest is not None
+            )
 
-        self.lock.write_release()
+        for listener in self._listeners:
+            listener(self._snapshot)
@@ -0,0 +1,89 @@
+from hashlib import sha256
+from os import replace as os_replace
+from pathlib import Path
+from pickle import dumps as pickle_dumps  # nosec
+from pickle import loads as pickle_loads  # nosec
+from tempfile import NamedTemporaryFile
+from typing import Iterable
+from typing import Optional
+from typing import Tuple
+
+from .container import Post
+from .image import ImagePipeline
+from .markdown import fingerprint
+from .util import Url
+from .util import warning
+
+# Threat model: The cache directory is only ever written to by the app itself
+
+# Has to be incremented whenever `Post` (or anything it contains) changes shape,
+# or the way posts are built from their source changes (e.g. `ReadTime`)
+CACHE_VERSION = 3
+CACHE_SUFFIX = ".pickle"
+
+Built = Tuple[Post, Post._RenderedPost]
+
+
+class Cache:
+    # Content addressed, entries are keyed on the digest of a post's source files
+    # combined with everything else the built post depends on (including the name
+    # of its folder). Entries are therefore never invalidated, only pruned once
+    # unused.
+    def __init__(
+        self,
+        path: Path,
+        base_static_url: Url,
+        images: Optional[ImagePipeline] = None,
+    ) -> None:
+        self.path = path
+        self.salt = repr(
+            (
+                CACHE_VERSION,
+                fingerprint(),
+                str(base_static_url),
+                images.fingerprint() if images is not None else None,
+            )
+        )
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def key(self, name: str, digest: str) -> str:
+        return sha256(f"{self.salt}\0{name}\0{digest}".encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, name: str, digest: str) -> Optional[Built]:
+        try:
+            raw = self._entry_path(self.key(name, digest)).read_bytes()
+        except OSError:
+            return None
+
+        try:
+            post, rendered = pickle_loads(raw)  # nosec
+        except Exception as e:
+            warning(f"discarding unreadable cache entry for {name}: {e!r}")
+            return None
+
+        return post, rendered
+
+    def put(self, name: str, digest: str, built: Built) -> None:
+        try:
+            # Written to a temporary file first, readers (possibly in other
+            # processes) never observe partially written entries
+            with NamedTemporaryFile(dir=self.path, suffix=".tmp", delete=False) as file:
+                file.write(pickle_dumps(built))
+            os_replace(file.name, self._entry_path(self.key(name, digest)))
+        except OSError as e:
+            warning(f"could not write cache entry for {name}: {e!r}")
+
+    # Removes every entry not referenced by `entries` (pairs of name and digest)
+    def prune(self, entries: Iterable[Tuple[str, str]]) -> None:
+        keep = {self._entry_path(self.key(name, digest)) for name, digest in entries}
+
+        for path in self.path.iterdir():
+            if path not in keep and path.suffix in (CACHE_SUFFIX, ".tmp"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,105 @@
+from gzip import compress as gzip_compress
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Optional
+
+# Compressors are optional, encodings are only offered if their module is present
+try:
+    from brotli import compress as brotli_compress
+except ImportError:
+    brotli_compress = None  # type: ignore
+
+try:
+    # Python 3.14+
+    from compression.zstd import compress as zstd_compress  # type: ignore
+except ImportError:
+    try:
+        from zstandard import compress as zstd_compress  # type: ignore
+    except ImportError:
+        zstd_compress = None  # type: ignore
+
+# Packages of encodings that aren't offered
+MISSING = [
+    package
+    for package, compressor in (
+        ("brotli", brotli_compress),
+        ("zstandard", zstd_compress),
+    )
+    if compressor is None
+]
+
+# Compressing smaller bodies isn't worth the overhead of the `Content-Encoding`
+MINIMUM_SIZE = 512
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ZSTD_LEVEL = 19
+
+Compressor = Callable[[bytes], bytes]
+
+# Ordered by preference, used to break ties between equally acceptable encodings
+COMPRESSORS: Dict[str, Compressor] = {}
+
+if brotli_compress is not None:
+    COMPRESSORS["br"] = lambda body: brotli_compress(body, quality=BROTLI_QUALITY)
+if zstd_compress is not None:
+    COMPRESSORS["zstd"] = lambda body: zstd_compress(body, ZSTD_LEVEL)
+# Without `mtime` the output would differ every time
+COMPRESSORS["gzip"] = lambda body: gzip_compress(body, GZIP_LEVEL, mtime=0)
+
+
+# Pages are only ever compressed once (when they're built), variants that
+# aren't smaller than `body` are omitted
+def compress(body: bytes) -> Dict[str, bytes]:
+    if len(body) < MINIMUM_SIZE:
+        return {}
+
+    variants = {}
+
+    for encoding, compressor in COMPRESSORS.items():
+        variant = compressor(body)
+        if len(variant) < len(body):
+            variants[encoding] = variant
+
+    return variants
+
+
+def _quality(parameters: Iterable[str]) -> float:
+    for parameter in parameters:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+
+    return 1.0
+
+
+# Returns the most acceptable of `available` (`None` for the unencoded body)
+# https://www.rfc-editor.org/rfc/rfc9110#section-12.5.3
+def negotiate(
+    accept_encoding: Optional[str], available: Iterable[str]
+) -> Optional[str]:
+    if accept_encoding is None:
+        return None
+
+    qualities: Dict[str, float] = {}
+    for coding in accept_encoding.split(","):
+        name, *parameters = coding.split(";")
+        qualities[name.strip().lower()] = _quality(parameters)
+
+    wildcard = qualities.get("*", 0.0)
+
+    best: Optional[str] = None
+    best_quality = 0.0
+
+    # `available` is ordered by preference, later encodings have to be strictly
+    # more acceptable to be picked
+    for encoding in available:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from pydantic import EmailStr
 from pydantic import Field
@@ -34,9 +35,22 @@ from .util import Url
 """
 
 
+@dataclass(frozen=True)
+class ImageVariant:
+    url: Url
+    width: int
+    # Media type, e.g. `image/webp`
+    type: str
+
+
 @dataclass(frozen=True)
 class Image:
     url: Url
+    # Intrinsic dimensions, `None` if the image couldn't be read
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # Resized (and re-encoded) versions of the image, narrowest first
+    variants: Tuple[ImageVariant, ...] = ()
 
 
 class ReadTimeHint(ConfiguredBaseModel):
@@ -0,0 +1,64 @@
+from threading import Condition
+from threading import Thread
+from time import monotonic
+from typing import Callable
+from typing import Optional
+
+from .util import warning
+
+
+class Debouncer:
+    # Calls `method` once triggers stopped arriving for `delay` seconds, but no
+    # later than `max_delay` seconds after the first trigger of a burst.
+    # `method` is only ever called from a single thread, calls therefore never
+    # overlap. Triggers that arrive during a call cause another call afterwards.
+    def __init__(
+        self, method: Callable[[], None], delay: float, max_delay: float
+    ) -> None:
+        self.method = method
+        self.delay = delay
+        self.max_delay = max(delay, max_delay)
+
+        self._condition = Condition()
+        self._first: Optional[float] = None
+        self._last: Optional[float] = None
+
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def trigger(self) -> None:
+        with self._condition:
+            now = monotonic()
+
+            if self._first is None:
+                self._first = now
+            self._last = now
+
+            self._condition.notify()
+
+    def _wait(self) -> None:
+        with self._condition:
+            while self._first is None or self._last is None:
+                self._condition.wait()
+
+            while True:
+                deadline = min(self._last + self.delay, self._first + self.max_delay)
+                remaining = deadline - monotonic()
+
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            self._first = None
+            self._last = None
+
+    def _run(self) -> None:
+        while True:
+            self._wait()
+
+            try:
+                self.method()
+            except Exception as e:
+                # Keeps the thread alive for subsequent triggers
+                warning(f"debounced call failed: {e!r}")
@@ -0,0 +1,7 @@
+from .base import build_entry
+from .base import build_feeds
+from .base import FeedEntry
+from .base import Feeds
+from .metadata import FeedMetadata
+
+__all__ = ["build_entry", "build_feeds", "FeedEntry", "Feeds", "FeedMetadata"]
@@ -0,0 +1,105 @@
+from datetime import datetime
+from io import StringIO
+from typing import Dict
+from typing import Optional
+from typing import Sequence
+from xml.sax.saxutils import XMLGenerator  # nosec
+
+from ..container import Post
+from ..page import http_date
+from ..util import Url
+from .metadata import FeedMetadata
+
+# Threat model: Blog posts are trusted
+
+# https://www.rfc-editor.org/rfc/rfc4287
+NAMESPACE = "http://www.w3.org/2005/Atom"
+
+
+def _date(date: datetime) -> str:
+    return http_date(date).isoformat()
+
+
+def _element(
+    handler: XMLGenerator,
+    name: str,
+    value: Optional[str],
+    attributes: Optional[Dict[str, str]] = None,
+) -> None:
+    handler.startElement(name, {} if attributes is None else attributes)
+    if value is not None:
+        handler.characters(value)
+    handler.endElement(name)
+
+
+def serialize_entry(
+    post: Post, rendered: Post._RenderedPost, modified: datetime, base_url: Url
+) -> str:
+    link = str(post.link(base_url))
+
+    output = StringIO()
+    handler = XMLGenerator(output, "UTF-8")
+
+    handler.startElement("entry", {})
+    _element(handler, "title", post.title)
+    _element(handler, "id", link)
+    _element(handler, "link", None, {"rel": "alternate", "href": link})
+    _element(handler, "published", _date(post.metadata.date))
+    _element(handler, "updated", _date(modified))
+
+    if post.metadata.author is not None:
+        handler.startElement("author", {})
+        _element(handler, "name", post.metadata.author)
+        _element(handler, "email", post.metadata.author)
+        handler.endElement("author")
+
+    _element(handler, "summary", post.metadata.description)
+    for tag in post.metadata.tags:
+        _element(handler, "category", None, {"term": tag})
+    _element(handler, "content", rendered.html, {"type": "html"})
+    handler.endElement("entry")
+
+    return output.getvalue()
+
+
+# `entries` have to be serialized with `serialize_entry`
+def build_feed(
+    entries: Sequence[str], feed_metadata: FeedMetadata, updated: datetime
+) -> str:
+    output = StringIO()
+    handler = XMLGenerator(output, "UTF-8")
+
+    handler.startDocument()
+    handler.startElement(
+        "feed", {"xmlns": NAMESPACE, "xml:lang": feed_metadata.language}
+    )
+
+    _element(handler, "title", feed_metadata.title)
+    if len(feed_metadata.description) > 0:
+        _element(handler, "subtitle", feed_metadata.description)
+    _element(handler, "id", str(feed_metadata.atom_url))
+    _element(
+        handler,
+        "link",
+        None,
+        {
+            "rel": "self",
+            "type": "application/atom+xml",
+            "href": str(feed_metadata.atom_url),
+        },
+    )
+    _element(handler, "updated", _date(updated))
+
+    # Entries without an author of their own are attributed to the blog
+    handler.startElement("author", {})
+    _element(handler, "name", feed_metadata.title)
+    handler.endElement("author")
+
+    for entry in entries:
+        # The only public method of `XMLGenerator` that writes content unescaped
+        handler.ignorableWhitespace(entry)
+
+    handler.endElement("feed")
+    handler.endDocument()
+
+    return output.getvalue()
@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+
+from . import atom
+from . import json_feed
+from . import rss
+from ..container import Post
+from .metadata import FeedMetadata
+
+
+# Serializations of a single post, only rebuilt once the post changes
+@dataclass(frozen=True)
+class FeedEntry:
+    rss: str
+    atom: str
+    json_feed: str
+
+
+@dataclass(frozen=True)
+class Feeds:
+    rss: str
+    atom: str
+    json_feed: str
+
+
+def build_entry(
+    post: Post,
+    rendered: Post._RenderedPost,
+    modified: datetime,
+    feed_metadata: FeedMetadata,
+) -> FeedEntry:
+    return FeedEntry(
+        rss.serialize_item(post, rendered, feed_metadata.base_url),
+        atom.serialize_entry(post, rendered, modified, feed_metadata.base_url),
+        json_feed.serialize_item(post, rendered, modified, feed_metadata.base_url),
+    )
+
+
+# Only the feed headers are serialized, entries are reused as is
+def build_feeds(
+    entries: Sequence[FeedEntry], feed_metadata: FeedMetadata, updated: datetime
+) -> Feeds:
+    return Feeds(
+        rss.build_feed([entry.rss for entry in entries], feed_metadata, updated),
+        atom.build_feed([entry.atom for entry in entries], feed_metadata, updated),
+        json_feed.build_feed([entry.json_feed for entry in entries], feed_metadata),
+    )
@@ -0,0 +1,57 @@
+from datetime import datetime
+from json import dumps
+from typing import Dict
+from typing import Sequence
+
+from ..container import Post
+from ..page import http_date
+from ..util import Url
+from .metadata import FeedMetadata
+
+# https://www.jsonfeed.org/version/1.1/
+VERSION = "https://jsonfeed.org/version/1.1"
+
+
+def _date(date: datetime) -> str:
+    return http_date(date).isoformat()
+
+
+def serialize_item(
+    post: Post, rendered: Post._RenderedPost, modified: datetime, base_url: Url
+) -> str:
+    link = str(post.link(base_url))
+
+    item: Dict[str, object] = {
+        "id": link,
+        "url": link,
+        "title": post.title,
+        "content_html": rendered.html,
+        "summary": post.metadata.description,
+        "date_published": _date(post.metadata.date),
+        "date_modified": _date(modified),
+        "tags": post.metadata.tags,
+    }
+
+    if post.metadata.author is not None:
+        item["authors"] = [
+            {"name": post.metadata.author, "url": f"mailto:{post.metadata.author}"}
+        ]
+
+    return dumps(item, ensure_ascii=False)
+
+
+# `items` have to be serialized with `serialize_item`
+def build_feed(items: Sequence[str], feed_metadata: FeedMetadata) -> str:
+    feed: Dict[str, object] = {
+        "version": VERSION,
+        "title": feed_metadata.title,
+        "feed_url": str(feed_metadata.json_feed_url),
+        "language": feed_metadata.language,
+        "authors": [{"name": feed_metadata.title}],
+    }
+
+    if len(feed_metadata.description) > 0:
+        feed["description"] = feed_metadata.description
+
+    # Items are spliced in as is instead of being parsed and serialized again
+    return f'{dumps(feed, ensure_ascii=False)[:-1]}, "items": [{", ".join(items)}]}}'
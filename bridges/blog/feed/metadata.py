@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+
+from ..util import Url
+
+
+@dataclass(frozen=True)
+class FeedMetadata:
+    title: str
+    description: str
+    language: str
+
+    # Posts are linked relative to this URL
+    base_url: Url
+
+    rss_url: Url
+    atom_url: Url
+    json_feed_url: Url
@@ -0,0 +1,96 @@
+from datetime import datetime
+from io import StringIO
+from typing import cast
+from typing import Dict
+from typing import Sequence
+from xml.sax.saxutils import XMLGenerator  # nosec
+
+from rfeed import Category
+from rfeed import Extension
+from rfeed import Feed
+from rfeed import Guid
+from rfeed import Item
+from rfeed import Serializable
+
+from ..container import Post
+from ..util import encode_as_cdata
+from ..util import Url
+from .metadata import FeedMetadata
+
+# Threat model: Blog posts are trusted
+
+
+class PostWrapper(Serializable):
+    def __init__(self, rendered: Post._RenderedPost):
+        super().__init__()
+
+        self.rendered = rendered
+
+    def publish(self, handler: XMLGenerator) -> None:
+        Serializable.publish(self, handler)
+
+        self._write_element("content:encoded", encode_as_cdata(self.rendered.html), {})
+
+
+# An item that was serialized ahead of time
+class Fragment(Serializable):
+    def __init__(self, fragment: str):
+        super().__init__()
+
+        self.fragment = fragment
+
+    def publish(self, handler: XMLGenerator) -> None:
+        Serializable.publish(self, handler)
+
+        # The only public method of `XMLGenerator` that writes content unescaped
+        handler.ignorableWhitespace(self.fragment)
+
+
+# Adds namespace for `<content:encoded>`
+class ContentExtension(Extension):
+    def get_namespace(self) -> Dict[str, str]:
+        return {"xmlns:content": "http://purl.org/rss/1.0/modules/content/"}
+
+
+def build_item(post: Post, rendered: Post._RenderedPost, base_url: Url) -> Item:
+    link = post.link(base_url)
+
+    return Item(
+        title=post.title,
+        link=link,
+        description=post.metadata.description,
+        author=post.metadata.author,
+        guid=Guid(link),
+        pubDate=post.metadata.date,
+        categories=[Category(tag) for tag in post.metadata.tags],
+        enclosure=PostWrapper(rendered),
+    )
+
+
+def serialize_item(post: Post, rendered: Post._RenderedPost, base_url: Url) -> str:
+    output = StringIO()
+    build_item(post, rendered, base_url).publish(XMLGenerator(output, "UTF-8"))
+
+    return output.getvalue()
+
+
+# `items` have to be serialized with `serialize_item`
+def build_feed(
+    items: Sequence[str],
+    feed_metadata: FeedMetadata,
+    # Not the current time, so that unchanged feeds serialize identically
+    last_build_date: datetime,
+) -> str:
+    feed = Feed(
+        title=feed_metadata.title,
+        link=feed_metadata.rss_url,
+        description=feed_metadata.description,
+        language=feed_metadata.language,
+        lastBuildDate=last_build_date,
+        items=[Fragment(item) for item in items],
+        extensions=[ContentExtension()],
+    )
+    feed.docs = None
+    feed.generator = None
+
+    return cast(str, feed.rss())
@@ -0,0 +1,306 @@
+from dataclasses import replace
+from hashlib import sha256
+from html import escape
+from html import unescape
+from io import BytesIO
+from os import chmod
+from os import replace as os_replace
+from pathlib import Path
+from re import compile as re_compile
+from re import Match
+from tempfile import NamedTemporaryFile
+from typing import Dict
+from typing import List
+from typing import Tuple
+from urllib.parse import unquote
+
+from .container import Image
+from .container import ImageVariant
+from .container import Post
+from .util import Url
+from .util import warning
+
+# Variants are only generated if Pillow is present, images are served as is
+# otherwise
+try:
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+    from PIL import __version__ as PIL_VERSION
+
+    PILLOW = True
+except ImportError:
+    PILLOW = False
+    PIL_VERSION = None  # type: ignore
+
+# Has to be incremented whenever the way variants are generated changes
+PIPELINE_VERSION = 2
+
+# Posts are at most 896px wide (`src/style/base.css`), variants cover narrow
+# screens as well as 2x displays
+WIDTHS = (448, 896, 1792)
+SIZES = "(max-width: 896px) 100vw, 896px"
+QUALITY = 80
+
+# Formats variants are generated in, keyed on the format reported by Pillow:
+# (media type, Pillow format, suffix)
+Format = Tuple[str, str, str]
+RESIZABLE: Dict[str, Format] = {
+    "PNG": ("image/png", "PNG", ".png"),
+    "JPEG": ("image/jpeg", "JPEG", ".jpg"),
+}
+# Offered in addition to the original format (browsers pick the first `<source>`
+# they support)
+MODERN: List[Format] = [("image/webp", "WEBP", ".webp")]
+MODERN_TYPES = [type_ for type_, _, _ in MODERN]
+
+IMG_TAG = re_compile(r"<img\b[^>]*>")
+ATTRIBUTE = re_compile(r"""\s([a-zA-Z-]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'))?""")
+
+
+def _attributes(tag: str) -> Dict[str, str]:
+    return {
+        match.group(1).lower(): unescape(match.group(2) or match.group(3) or "")
+        for match in ATTRIBUTE.finditer(tag[len("<img") :])
+    }
+
+
+def _srcset(variants: List[ImageVariant]) -> str:
+    return ", ".join(f"{variant.url} {variant.width}w" for variant in variants)
+
+
+# Generates resized and re-encoded variants of the images referenced by posts.
+# Variants are content addressed (named after the digest of their source image
+# and everything else they depend on), existing variants are never generated
+# again.
+class ImagePipeline:
+    def __init__(
+        self,
+        # Variants are written to this directory, which must not be located inside
+        # the blog (writing to it would trigger another refresh)
+        path: Path,
+        # URL `path` is served at
+        url: Url,
+        widths: Tuple[int, ...] = WIDTHS,
+        sizes: str = SIZES,
+        quality: int = QUALITY,
+    ) -> None:
+        self.path = path
+        self.url = url
+        self.widths = tuple(sorted(widths))
+        self.sizes = sizes
+        self.quality = quality
+
+        if not PILLOW:
+            warning("Pillow is not installed, blog images won't be optimized")
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    # Changes whenever the output of `apply` could change for the same input
+    def fingerprint(self) -> str:
+        return repr(
+            (
+                PIPELINE_VERSION,
+                PIL_VERSION,
+                str(self.url),
+                self.widths,
+                self.sizes,
+                self.quality,
+            )
+        )
+
+    # Whether every variant referenced by `rendered` still exists (the directory
+    # might have been cleared since `rendered` was built)
+    def complete(self, rendered: Post._RenderedPost) -> bool:
+        prefix = f"{self.url}/"
+
+        return all(
+            (self.path / str(variant.url)[len(prefix) :]).exists()
+            for image in rendered.images
+            for variant in image.variants
+            if str(variant.url).startswith(prefix)
+        )
+
+    def _save(
+        self, image: "PILImage.Image", format_: Format, name: str, lossless: bool
+    ) -> None:
+        target = self.path / name
+        if target.exists():
+            return
+
+        _, pillow_format, _ = format_
+        options: Dict[str, object] = {"optimize": True}
+        if pillow_format == "JPEG":
+            options.update(quality=self.quality, progressive=True)
+        elif pillow_format == "WEBP":
+            options = {"lossless": True} if lossless else {"quality": self.quality}
+
+        # Written to a temporary file first, processes building other posts might
+        # reference the same image
+        with NamedTemporaryFile(dir=self.path, suffix=".tmp", delete=False) as file:
+            image.save(file, pillow_format, **options)
+        # Temporary files are only readable by their owner, variants might be
+        # served by a web server running as another user
+        chmod(file.name, 0o644)
+        os_replace(file.name, target)
+
+    def _variants(
+        self, image: "PILImage.Image", original: Format, digest: str
+    ) -> Tuple[ImageVariant, ...]:
+        width, height = image.size
+        widths = [width_ for width_ in self.widths if width_ < width] + [width]
+
+        resized = {
+            width_: image
+            if width_ == width
+            else image.resize(
+                (width_, max(round(height * width_ / width), 1)),
+                PILImage.Resampling.LANCZOS,
+            )
+            for width_ in widths
+        }
+
+        # PNGs are mostly screenshots, lossy compression would blur their text
+        lossless = original[1] == "PNG"
+
+        variants = []
+        for format_ in [original, *MODERN]:
+            type_, _, suffix = format_
+
+            for width_, variant in resized.items():
+                # The original image is the fallback for this width
+                if format_ == original and width_ == width:
+                    continue
+
+                name = f"{digest}-{width_}{suffix}"
+                self._save(variant, format_, name, lossless)
+                variants.append(ImageVariant(self.url / name, width_, type_))
+
+        return tuple(variants)
+
+    def process(self, image: Image, source: Path) -> Image:
+        if not PILLOW:
+            return image
+
+        try:
+            data = source.read_bytes()
+        except OSError:
+            return image
+
+        digest = sha256(data + self.fingerprint().encode()).hexdigest()[:32]
+
+        try:
+            with PILImage.open(BytesIO(data)) as opened:
+                original = RESIZABLE.get(opened.format or "", None)
+                animated = getattr(opened, "is_animated", False)
+                # Browsers honor the orientation stored in EXIF metadata
+                transposed = ImageOps.exif_transpose(opened) or opened
+                width, height = transposed.size
+
+                if original is None or animated:
+                    return replace(image, width=width, height=height)
+
+                converted = transposed.convert(
+                    "RGBA"
+                    if transposed.mode in ("RGBA", "LA", "PA")
+                    or "transparency" in transposed.info
+                    else "RGB"
+                )
+                if original[1] == "JPEG" and converted.mode == "RGBA":
+                    converted = converted.convert("RGB")
+
+                variants = self._variants(converted, original, digest)
+        except (OSError, ValueError, PILImage.DecompressionBombError) as e:
+            warning(f"could not optimize {source}: {e!r}")
+            return image
+
+        return Image(image.url, width, height, variants)
+
+    def _rewrite(
+        self, match: "Match[str]", images: Dict[str, Image], lazy: bool
+    ) -> str:
+        tag = match.group(0)
+        attributes = _attributes(tag)
+        image = images.get(attributes.get("src", ""), None)
+
+        added = {"loading": "lazy"} if lazy else {}
+        added["decoding"] = "async"
+        sources = []
+
+        if image is not None and image.width is not None and image.height is not None:
+            # Dimensions set by the author take precedence (both of them, setting
+            # only one would distort the image)
+            if "width" not in attributes and "height" not in attributes:
+                added.update(width=str(image.width), height=str(image.height))
+
+            fallback = [
+                variant
+                for variant in image.variants
+                if variant.type not in MODERN_TYPES
+            ]
+            if len(fallback) > 0:
+                original = ImageVariant(image.url, image.width, "")
+                added.update(srcset=_srcset([*fallback, original]), sizes=self.sizes)
+
+            for type_ in MODERN_TYPES:
+                variants = [
+                    variant for variant in image.variants if variant.type == type_
+                ]
+                if len(variants) > 0:
+                    sources.append(
+                        '<source type="{}" srcset="{}" sizes="{}">'.format(
+                            type_, escape(_srcset(variants)), escape(self.sizes)
+                        )
+                    )
+
+        end = " />" if tag.endswith("/>") else ">"
+        rewritten = "{}{}{}".format(
+            tag[: -len(end.lstrip())].rstrip(),
+            "".join(
+                ' {}="{}"'.format(name, escape(value))
+                for name, value in added.items()
+                if name not in attributes
+            ),
+            end,
+        )
+
+        if len(sources) == 0:
+            return rewritten
+        return "<picture>{}{}</picture>".format("".join(sources), rewritten)
+
+    # Adds intrinsic dimensions, lazy loading (except for the first) and the
+    # generated variants to the images of `rendered`, which are read from `content_path`
+    def apply(
+        self,
+        rendered: Post._RenderedPost,
+        content_path: Path,
+        base_post_static_url: Url,
+    ) -> Post._RenderedPost:
+        prefix = f"{base_post_static_url}/"
+        root = content_path.resolve()
+
+        images: Dict[str, Image] = {}
+        for image in rendered.images:
+            url = str(image.url)
+            if url in images or not url.startswith(prefix):
+                continue
+
+            source = (root / unquote(url[len(prefix) :])).resolve()
+            try:
+                source.relative_to(root)
+            except ValueError:
+                continue
+
+            images[url] = self.process(image, source)
+
+        # The first image is likely visible without scrolling, loading it lazily
+        # would only delay it
+        first = IMG_TAG.search(rendered.html)
+        eager = first.start() if first is not None else -1
+        html = IMG_TAG.sub(
+            lambda match: self._rewrite(match, images, match.start() != eager),
+            rendered.html,
+        )
+
+        return Post._RenderedPost(
+            html, [images.get(str(image.url), image) for image in rendered.images]
+        )
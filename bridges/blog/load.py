@@ -0,0 +1,164 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from itertools import repeat
+from multiprocessing import get_context
+from pathlib import Path
+from threading import active_count
+from typing import List
+from typing import Optional
+
+from result import Ok
+
+from .asset import version_content
+from .asset import version_image
+from .cache import Cache
+from .constant import CONTENT_FOLDER
+from .container import Post
+from .image import ImagePipeline
+from .source import Source
+from .util import Url
+from .util import warning
+
+# Below this number of folders the overhead of starting worker processes
+# outweighs the gains
+PARALLEL_THRESHOLD = 8
+
+
+# Faults are not sent between processes as is (`pydantic.ValidationError` can't be
+# pickled reliably), only their type and description
+@dataclass(frozen=True)
+class Failure:
+    kind: str
+    description: str
+
+
+@dataclass(frozen=True)
+class Loaded:
+    source: Source
+    # Either `post` and `rendered` or `failure` are set
+    post: Optional[Post] = None
+    rendered: Optional[Post._RenderedPost] = None
+    failure: Optional[Failure] = None
+    # Restored from the cache instead of being built
+    cached: bool = False
+
+
+# Optimizes the images of a rendered post and versions the URLs of its content
+def finish(
+    rendered: Post._RenderedPost,
+    content_path: Path,
+    base_post_static_url: Url,
+    images: Optional[ImagePipeline] = None,
+) -> Post._RenderedPost:
+    if images is not None:
+        rendered = images.apply(rendered, content_path, base_post_static_url)
+
+    return Post._RenderedPost(
+        version_content(rendered.html, content_path, base_post_static_url),
+        [
+            version_image(image, content_path, base_post_static_url)
+            for image in rendered.images
+        ],
+    )
+
+
+def load(
+    folder: Path,
+    base_static_url: Url,
+    cache: Optional[Cache] = None,
+    images: Optional[ImagePipeline] = None,
+) -> Loaded:
+    # Obtained before reading the post, a concurrent modification will therefore
+    # always be picked up by the next refresh
+    source = Source.new(folder)
+
+    if cache is not None and source.digest is not None:
+        built = cache.get(folder.name, source.digest)
+        if built is not None and (images is None or images.complete(built[1])):
+            return Loaded(source, *built, cached=True)
+
+    sentinel = Post.valid(folder)
+    if isinstance(sentinel, Ok):
+        post = Post.new(sentinel.ok())
+        rendered = finish(
+            post.render(base_static_url),
+            folder / CONTENT_FOLDER,
+            base_static_url / post.name / CONTENT_FOLDER,
+            images,
+        )
+
+        if cache is not None and source.digest is not None:
+            cache.put(folder.name, source.digest, (post, rendered))
+
+        return Loaded(source, post, rendered)
+
+    fault = sentinel.err()
+    return Loaded(source, failure=Failure(type(fault).__name__, fault.description))
+
+
+class Workers:
+    # Processes posts are loaded by. They're forked once, when the pool is created,
+    # and reused by every refresh. Forking is only safe while no other threads are
+    # running (a lock held by another thread would remain locked in the forked
+    # process forever), pools therefore have to be created before any thread is
+    # started. `spawn` and `forkserver` aren't an option, their workers would
+    # re-import (and therefore re-run) the main module.
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        if active_count() > 1:
+            warning("threads are already running, posts are loaded serially")
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("fork")
+        )
+        # Processes are only forked once the first task is submitted
+        self._executor.submit(int).result()
+
+    def map(
+        self,
+        folders: List[Path],
+        base_static_url: Url,
+        cache: Optional[Cache] = None,
+        images: Optional[ImagePipeline] = None,
+    ) -> Optional[List[Loaded]]:
+        if self._executor is None:
+            return None
+
+        try:
+            return list(
+                self._executor.map(
+                    load,
+                    folders,
+                    repeat(base_static_url),
+                    repeat(cache),
+                    repeat(images),
+                    chunksize=max(1, len(folders) // (self.workers * 4)),
+                )
+            )
+        except BrokenProcessPool:
+            # Workers can't be forked again safely once threads are running
+            warning("a worker process died, posts are loaded serially from now on")
+            self._executor = None
+            return None
+
+
+def load_all(
+    folders: List[Path],
+    base_static_url: Url,
+    workers: Optional[Workers] = None,
+    cache: Optional[Cache] = None,
+    images: Optional[ImagePipeline] = None,
+) -> List[Loaded]:
+    loaded = (
+        workers.map(folders, base_static_url, cache, images)
+        if workers is not None and len(folders) >= PARALLEL_THRESHOLD
+        else None
+    )
+    if loaded is not None:
+        return loaded
+
+    return [load(folder, base_static_url, cache, images) for folder in folders]
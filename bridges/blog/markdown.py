@@ -1,114 +1,188 @@
+from dataclasses import dataclass
 from functools import lru_cache
-from threading import Condition
-from threading import Event
+from importlib.metadata import version
+from queue import Empty
+from queue import LifoQueue
 from threading import Lock
-from threading import Thread
-from typing import List
+from typing import Tuple
 
 from markdown import Markdown
 
 from .util import warning
 
 
+EXTENSIONS = [
+    "admonition",
+    "codehilite",
+    "fenced_code",
+    "footnotes",
+    "nl2br",
+    "pymdownx.keys",
+    "pymdownx.tasklist",
+    "pymdownx.tilde",
+    "tables",
+]
+EXTENSION_CONFIGS = {
+    "codehilite": {
+        "css_class": "highlight",
+        "guess_lang": False,
+        "linenums": False,
+    }
+}
+OUTPUT_FORMAT = "html"
+
+
 def build_markdown() -> Markdown:
     return Markdown(
-        extensions=[
-            "admonition",
-            "codehilite",
-            "fenced_code",
-            "footnotes",
-            "nl2br",
-            "pymdownx.keys",
-            "pymdownx.tasklist",
-            "pymdownx.tilde",
-            "tables",
-        ],
-        extension_configs={
-            "codehilite": {
-                "css_class": "highlight",
-                "guess_lang": False,  # type: ignore
-                "linenums": False,  # type: ignore
-            }
-        },
-        output_format="html",
+        extensions=EXTENSIONS,
+        extension_configs=EXTENSION_CONFIGS,  # type: ignore
+        output_format=OUTPUT_FORMAT,  # type: ignore
     )
 
 
-LRU_SIZE = 64
-# `Markdown.reset()` doesn't sufficiently evict all leftovers of previous render
-POOL_SIZE = 32
-POOL_PRESSURE = POOL_SIZE / 4
-POOL: List[Markdown] = [build_markdown() for _ in range(POOL_SIZE)]
-POOL_BITMAP: List[bool] = [True for _ in range(POOL_SIZE)]
-POOL_BITMAP_LOCK = Lock()
-POOL_EXHAUSTED_CONDITION = Condition()
-HYDRATION_EVENT = Event()
-
-
-def hydrate() -> None:
-    while True:
-        HYDRATION_EVENT.wait()
-        HYDRATION_EVENT.clear()
-
-        POOL_BITMAP_LOCK.acquire()
-        required_instance_count = POOL_BITMAP.count(False)
-        POOL_BITMAP_LOCK.release()
-
-        if required_instance_count >= POOL_PRESSURE:
-            instances = [build_markdown() for _ in range(required_instance_count)]
-
-            POOL_BITMAP_LOCK.acquire()
+# Changes whenever the output of `render` could change for the same input
+def fingerprint() -> str:
+    return repr(
+        (
+            version("markdown"),
+            version("pymdown-extensions"),
+            version("pygments"),
+            EXTENSIONS,
+            EXTENSION_CONFIGS,
+            OUTPUT_FORMAT,
+        )
+    )
 
-            for idx, bit in enumerate(POOL_BITMAP):
-                if not bit:
-                    try:
-                        instance = instances.pop(0)
-                    except IndexError:
-                        break
-                    else:
-                        POOL[idx] = instance
-                        POOL_BITMAP[idx] = True
 
-            POOL_BITMAP_LOCK.release()
-            with POOL_EXHAUSTED_CONDITION:
-                POOL_EXHAUSTED_CONDITION.notify()
+LRU_SIZE = 64
+# Upper bound for the number of pooled instances, instances are only built once
+# concurrent renders require them
+POOL_SIZE = 8
+# Seconds to wait for an instance once all `POOL_SIZE` instances are in use,
+# afterwards a temporary instance is built instead of waiting any longer
+POOL_TIMEOUT = 1.0
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    size: int
+    idle: int
+    in_use: int
+    # Instances built for the pool
+    created: int
+    # Temporary instances built because the pool was exhausted
+    overflow: int
+    # Instances dropped because a render failed
+    discarded: int
+    renders: int
+
+
+class Pool:
+    # Idle instances are kept in a LIFO queue, the most recently used (and
+    # therefore hottest) instance is handed out first. Instances are reset when
+    # they are returned, the extension chain is only ever built once per instance.
+    def __init__(self, size: int, timeout: float) -> None:
+        self.size = size
+        self.timeout = timeout
+
+        self._idle: "LifoQueue[Markdown]" = LifoQueue(maxsize=size)
+        self._lock = Lock()
+
+        self._created = 0
+        self._in_use = 0
+        self._overflow = 0
+        self._discarded = 0
+        self._renders = 0
+
+    # Returns the instance and whether it belongs to the pool
+    def _acquire(self) -> Tuple[Markdown, bool]:
+        try:
+            instance = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+
+            if grow:
+                try:
+                    instance = build_markdown()
+                except Exception:
+                    # The slot was reserved for an instance that doesn't exist
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    instance = self._idle.get(timeout=self.timeout)
+                except Empty:
+                    warning("Render pool exhausted, consider incrementing `POOL_SIZE`")
+                    with self._lock:
+                        self._overflow += 1
+                        self._renders += 1
+                    return build_markdown(), False
+
+        with self._lock:
+            self._in_use += 1
+            self._renders += 1
+        return instance, True
+
+    def _release(self, instance: Markdown, failed: bool) -> None:
+        with self._lock:
+            self._in_use -= 1
+
+            if failed:
+                self._discarded += 1
+                # Frees up the slot, a replacement is built on demand
+                self._created -= 1
+                return
+
+        # `Markdown.reset()` doesn't sufficiently evict all leftovers of previous
+        # render. It does with the pinned Markdown and pymdownx versions (reset
+        # instances render exactly like fresh ones), which has to be re-checked
+        # whenever they're upgraded. Instances whose render failed aren't reset but
+        # discarded.
+        instance.reset()
+        self._idle.put_nowait(instance)
+
+    def convert(self, text: str) -> str:
+        instance, pooled = self._acquire()
+
+        try:
+            html = instance.convert(text)
+        except Exception:
+            if pooled:
+                # State of the instance is unknown
+                self._release(instance, True)
+            raise
+
+        if pooled:
+            self._release(instance, False)
+        return html
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                self.size,
+                self._idle.qsize(),
+                self._in_use,
+                self._created,
+                self._overflow,
+                self._discarded,
+                self._renders,
+            )
+
+
+POOL = Pool(POOL_SIZE, POOL_TIMEOUT)
 
 
 @lru_cache(maxsize=LRU_SIZE)
 def render(text: str) -> str:
-    POOL_BITMAP_LOCK.acquire()
-    try:
-        idx = POOL_BITMAP.index(True)
-    except ValueError:
-        warning(
-            "Render pool too small, consider incrementing `POOL_SIZE` or "
-            "decreasing `POOL_PRESSURE`"
-        )
-
-        # Ensure that at least one instance is avaliable
-        POOL_BITMAP_LOCK.release()
-        with POOL_EXHAUSTED_CONDITION:
-            POOL_EXHAUSTED_CONDITION.wait()
-            POOL_BITMAP_LOCK.acquire()
-
-        idx = POOL_BITMAP.index(True)
-    finally:
-        # `.index` is guaranteed to only ever throw `ValueError`, therefor this
-        # is safe
-
-        # Mark instance as used
-        POOL_BITMAP[idx] = False  # type: ignore
-        POOL_BITMAP_LOCK.release()
-        # Request creation of new instances
-        HYDRATION_EVENT.set()
-
-    instance = POOL[idx]  # type: ignore
+    return POOL.convert(text)
 
-    return instance.convert(text)
 
+def pool_stats() -> PoolStats:
+    return POOL.stats()
 
-t = Thread(target=hydrate)
-t.daemon = True
-t.start()
 
-__all__ = ["render"]
+__all__ = ["render", "pool_stats", "PoolStats"]
@@ -0,0 +1,144 @@
+from asyncio import get_running_loop
+from dataclasses import dataclass
+from datetime import datetime
+from datetime import timezone
+from email.utils import format_datetime
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from re import compile as re_compile
+from threading import Lock
+from typing import Callable
+from typing import Hashable
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+from .compress import compress
+
+EPOCH = datetime.fromtimestamp(0, timezone.utc)
+
+ENTITY_TAG = re_compile(r'(?:W/)?("[^"]*")')
+
+
+# HTTP dates have a resolution of one second, naive dates are assumed to be UTC
+def http_date(date: datetime) -> datetime:
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return date.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def format_http_date(date: datetime) -> str:
+    return format_datetime(http_date(date), usegmt=True)
+
+
+@dataclass(frozen=True)
+class Page:
+    body: bytes
+    # Strong validator, derived from the content
+    etag: str
+    last_modified: datetime
+    # Precompressed bodies by content coding
+    variants: Mapping[str, bytes]
+
+    @staticmethod
+    def new(
+        body: bytes, modified: datetime, previous: Optional["Page"] = None
+    ) -> "Page":
+        etag = f'"{sha256(body).hexdigest()[:32]}"'
+
+        if previous is not None:
+            if previous.etag == etag:
+                return previous
+            # The content changed without anything becoming newer (e.g. a post
+            # was removed), clients must not consider their copy fresh
+            if http_date(modified) <= previous.last_modified:
+                modified = datetime.now(timezone.utc)
+
+        return Page(body, etag, http_date(modified), compress(body))
+
+    # Body and ETag for the content coding `encoding` (`None` for `body`), every
+    # representation has its own strong validator
+    def representation(self, encoding: Optional[str]) -> Tuple[bytes, str]:
+        if encoding is None:
+            return self.body, self.etag
+        return self.variants[encoding], f'{self.etag[:-1]}-{encoding}"'
+
+
+EMPTY_PAGE = Page.new(b"", EPOCH)
+
+
+# A page that is only rebuilt once the key (e.g. generations of the data it's
+# built from) changes
+class CachedPage:
+    def __init__(
+        self,
+        key: Callable[[], Hashable],
+        # Returns the body and its modification date
+        build: Callable[[], Tuple[bytes, datetime]],
+    ) -> None:
+        self.key = key
+        self.build = build
+
+        self._current: Optional[Tuple[Hashable, Page]] = None
+        # Concurrent misses only build the page once
+        self._lock = Lock()
+
+    def get(self) -> Page:
+        # Obtained before building, the page is therefore never older than the
+        # key it's cached under
+        key = self.key()
+
+        current = self._current
+        if current is not None and current[0] == key:
+            return current[1]
+
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == key:
+                return current[1]
+
+            body, modified = self.build()
+            page = Page.new(body, modified, None if current is None else current[1])
+            self._current = (key, page)
+
+        return page
+
+    # For use on the event loop, misses are built (and waited for) on the default
+    # executor, building blocks
+    async def get_async(self) -> Page:
+        current = self._current
+        if current is not None and current[0] == self.key():
+            return current[1]
+
+        return await get_running_loop().run_in_executor(None, self.get)
+
+    # The page is built again on its next use
+    def invalidate(self) -> None:
+        with self._lock:
+            self._current = None
+
+
+# https://www.rfc-editor.org/rfc/rfc9110#section-13.2.2
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime,
+) -> bool:
+    # `If-Modified-Since` is ignored if `If-None-Match` is present
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison
+        return etag in ENTITY_TAG.findall(if_none_match)
+
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+        return http_date(last_modified) <= http_date(since)
+
+    return False
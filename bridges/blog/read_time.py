@@ -3,6 +3,7 @@ from re import Pattern as RegexPattern
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 
 from bs4 import BeautifulSoup
 
@@ -58,6 +59,48 @@ class BreakdownEntry:
     time: Time
 
 
+@dataclass
+class _Occurrences:
+    count: int = 0
+    lines: int = 0
+    words: int = 0
+
+    def add(self, text: str) -> None:
+        self.count += 1
+        # Don't include empty lines
+        self.lines += len([line for line in text.split("\n") if line != ""])
+        self.words += len(text.split(" "))
+
+
+# Counts and removes every match in a single scan (rather than `finditer` and
+# `sub`), subsequent patterns only apply to what's left
+def _consume(regex: "RegexPattern[str]", content: str) -> Tuple[_Occurrences, str]:
+    occurrences = _Occurrences()
+    remaining = []
+    position = 0
+
+    for match in regex.finditer(content):
+        occurrences.add(match.group())
+        remaining.append(content[position : match.start()])
+        position = match.end()
+    remaining.append(content[position:])
+
+    return occurrences, "".join(remaining)
+
+
+# Equivalent to matching `DEFAULT` (`.*`), which matches every line and the
+# (empty) end of every non-empty line, without running the regex
+def _text(content: str) -> _Occurrences:
+    occurrences = _Occurrences()
+
+    for line in content.split("\n"):
+        occurrences.add(line)
+        if line != "":
+            occurrences.add("")
+
+    return occurrences
+
+
 @dataclass(init=False)
 class ReadTime:
     overall_time: Time
@@ -69,40 +112,31 @@ class ReadTime:
         time_breakdown: Dict[Pattern, BreakdownEntry] = {}
 
         # Content within excluded tags should be included in read time estimate
-        stripped_post_content = ReadTime.strip_tags(post_content, hint.ignored_tags)
-
-        words: Optional[int] = None
-
-        for impact in IMPACT.keys():
-            count = 0
-            lines = 0
-            words = 0
-
-            for match in impact.regex.finditer(stripped_post_content):
-                idx_1, idx_2 = match.span()
-                text = stripped_post_content[idx_1:idx_2]
-
-                count += 1
-
-                # Don't include empty lines
-                lines += len([line for line in text.split("\n") if line != ""])
-                words += len(text.split(" "))
-
+        content = ReadTime.strip_tags(post_content, hint.ignored_tags)
+
+        # Every pattern only applies to what the previous ones didn't match
+        images, content = _consume(IMAGE_DESCRIPTION.regex, content)
+        captions, content = _consume(CAPTION_DESCRIPTION.regex, content)
+        text = _text(content)
+
+        for impact, occurrences in (
+            (IMAGE_DESCRIPTION, images),
+            (CAPTION_DESCRIPTION, captions),
+            (DEFAULT_DESCRIPTION, text),
+        ):
             time_breakdown[impact] = BreakdownEntry(
-                count,
+                occurrences.count,
                 Time.from_seconds(
-                    IMPACT[impact].per_occurrence * count
-                    + IMPACT[impact].per_line * lines
-                    + IMPACT[impact].per_word * words
+                    IMPACT[impact].per_occurrence * occurrences.count
+                    + IMPACT[impact].per_line * occurrences.lines
+                    + IMPACT[impact].per_word * occurrences.words
                 ),
             )
 
             overall_time += time_breakdown[impact].time
 
-            stripped_post_content = impact.regex.sub("", stripped_post_content)
-
         self.overall_time = overall_time
-        self.word_count = words or 0
+        self.word_count = text.words
         self.time_breakdown = time_breakdown
 
     @property
@@ -118,8 +152,9 @@ class ReadTime:
     @staticmethod
     def strip_tags(post_content: str, ignored_tags: List[str]) -> str:
         bs = BeautifulSoup(post_content, features="html5lib")
-        for tag in ignored_tags:
-            for bs_tag in bs.find_all(tag):
+        # A single traversal for every ignored tag
+        if len(ignored_tags) > 0:
+            for bs_tag in bs.find_all(ignored_tags):
                 bs_tag.decompose()
 
         return str(bs)
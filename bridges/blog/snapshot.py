@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from dataclasses import field
+from types import MappingProxyType
+from typing import Dict
+from typing import Mapping
+from typing import Tuple
+from typing import TypeVar
+
+from .container import Post
+from .feed import FeedEntry
+from .page import EMPTY_PAGE
+from .page import Page
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def freeze(mapping: Dict[K, V]) -> Mapping[K, V]:
+    return MappingProxyType(mapping)
+
+
+# Everything a reader needs, published by replacing the reference to the current
+# snapshot. Readers therefore never have to lock or copy, and a refresh never has
+# to wait for readers.
+@dataclass(frozen=True)
+class Snapshot:
+    # Sorted by date (newest first)
+    posts: Tuple[Post, ...] = ()
+    # Hidden posts are only reachable through their name
+    visible_posts: Tuple[Post, ...] = ()
+    post_index: Mapping[str, Post] = field(default_factory=lambda: freeze({}))
+    tags: Mapping[str, Tuple[Post, ...]] = field(default_factory=lambda: freeze({}))
+    visible_tags: Mapping[str, Tuple[Post, ...]] = field(
+        default_factory=lambda: freeze({})
+    )
+    rss: Page = EMPTY_PAGE
+    atom: Page = EMPTY_PAGE
+    json_feed: Page = EMPTY_PAGE
+    # Fully rendered pages
+    post_pages: Mapping[str, Page] = field(default_factory=lambda: freeze({}))
+    tag_pages: Mapping[str, Page] = field(default_factory=lambda: freeze({}))
+    # Serialized feed entries of the posts contained in the feeds
+    feed_entries: Mapping[str, FeedEntry] = field(default_factory=lambda: freeze({}))
+    # Incremented with every published snapshot
+    generation: int = 0
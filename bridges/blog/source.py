@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from hashlib import sha256
+from pathlib import Path
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .constant import BLOG_METADATA
+from .constant import BLOG_TEXT
+from .constant import CONTENT_FOLDER
+
+# Files a post is built from, in addition to the files of its content folder
+# (rendered posts contain the dimensions and variants of their images)
+SOURCE_FILES = (BLOG_TEXT, BLOG_METADATA)
+
+# Each source file with its (mtime in nanoseconds, size in bytes), `None` for
+# missing files (so that invalid folders are only reported once)
+Signature = Tuple[Tuple[str, Optional[Tuple[int, int]]], ...]
+
+
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Relative to the folder of the post, in a stable order
+def _files(path: Path) -> List[str]:
+    try:
+        content = sorted(
+            f"{CONTENT_FOLDER}/{child.name}"
+            for child in (path / CONTENT_FOLDER).iterdir()
+            if child.is_file()
+        )
+    except (FileNotFoundError, NotADirectoryError):
+        content = []
+
+    return [*SOURCE_FILES, *content]
+
+
+def signature(path: Path) -> Optional[Signature]:
+    try:
+        return tuple((file, _stat(path / file)) for file in _files(path))
+    except OSError:
+        return None
+
+
+def digest(path: Path) -> Optional[str]:
+    hash_ = sha256()
+
+    try:
+        for file in _files(path):
+            # Renaming a file changes the digest as well
+            hash_.update(file.encode())
+            hash_.update(b"\0")
+            try:
+                hash_.update((path / file).read_bytes())
+            except FileNotFoundError:
+                hash_.update(b"\1")
+            # Separates files so that content can't shift between them
+            hash_.update(b"\0")
+    except OSError:
+        return None
+
+    return hash_.hexdigest()
+
+
+@dataclass(frozen=True)
+class Source:
+    # Cheap to obtain, used to skip hashing for untouched folders
+    signature: Optional[Signature]
+    # Used to detect touched but otherwise unchanged folders
+    digest: Optional[str]
+
+    @staticmethod
+    def new(path: Path) -> "Source":
+        return Source(signature(path), digest(path))
+
+    # Returns an up to date `Source` if the folder at `path` still has the same
+    # content, `None` otherwise
+    def unchanged(self, path: Path) -> Optional["Source"]:
+        signature_ = signature(path)
+
+        if signature_ is None:
+            return None
+        if signature_ == self.signature:
+            return self
+
+        digest_ = digest(path)
+
+        if digest_ is not None and digest_ == self.digest:
+            return Source(signature_, digest_)
+        return None
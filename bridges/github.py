@@ -1,34 +1,34 @@
-from _thread import start_new_thread  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from socket import gaierror
+from threading import Lock
 from time import time
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
 
-from requests import get as _get
-from requests.models import Response
+from requests import Response
+from requests import Session
+from requests.adapters import HTTPAdapter
 
+from bridges.blog.util import info
+from bridges.blog.util import warning
+from bridges.store import Store
+from bridges.store import Stored
 
-class MockedResponse:
-    def __init__(self) -> None:
-        pass
+API_URL = "https://api.github.com"
+# Maximum allowed by the API
+PER_PAGE = 100
+# Upper bound for concurrent requests (and pooled connections)
+WORKERS = 8
+TIMEOUT = 10.0
 
-    def json(self) -> Union[List, Dict]:
-        return []
-
-
-# If GitHub is offline or the network connection is cut
-def get(*args, **kwargs) -> Union[MockedResponse, Response]:  # type: ignore
-    try:
-        response = _get(*args, **kwargs)
-        if response.status_code == 200:
-            return response
-        else:
-            return MockedResponse()
-    except (gaierror, IOError):
-        return MockedResponse()
+# Endpoints respond with either a list of objects or a single one
+JSON = Union[List[Dict], Dict]
 
 
 @dataclass(frozen=True, order=False)
@@ -49,6 +49,42 @@ class Repo:
     def __lt__(self, other: "Repo") -> bool:
         return self.stars < other.stars
 
+    @staticmethod
+    def new(repo: Dict) -> "Repo":
+        return Repo(
+            *[
+                repo["html_url"],
+                repo["name"],
+                repo["watchers_count"],
+                repo["stargazers_count"],
+                repo["fork"],
+                repo["archived"],
+                repo["description"],
+                repo["forks"],
+                repo["language"],
+            ]
+        )
+
+
+# Response body and validator of a URL, unchanged responses are revalidated with
+# `If-None-Match` (which doesn't count against the rate limit)
+@dataclass(frozen=True)
+class Fetched:
+    etag: Optional[str]
+    body: JSON
+    last_page: int
+
+
+def last_page(response: Response) -> int:
+    url = response.links.get("last", {}).get("url", None)
+    if url is None:
+        return 1
+
+    try:
+        return int(parse_qs(urlparse(url).query)["page"][0])
+    except (KeyError, ValueError):
+        return 1
+
 
 class GitHub:
     def __init__(
@@ -56,43 +92,260 @@ class GitHub:
         user: str,
         refresh_delay: int = 3600,
         disable_fetch: bool = False,
+        # Fetched in addition to the repos of `user` (`owner/name`)
         additional_repos: Optional[List[str]] = None,
+        # Includes repos of the public organizations of `user`
+        include_orgs: bool = False,
+        base_url: str = API_URL,
+        workers: int = WORKERS,
+        # Repos are persisted in and restored from this store
+        store: Optional[Store[Repo]] = None,
     ) -> None:
         self.user = user
         self.refresh_delay = refresh_delay
         self.disable_fetch = disable_fetch
         self.additional_repos = [] if additional_repos is None else additional_repos
+        self.include_orgs = include_orgs
+        self.base_url = base_url.rstrip("/")
+        self.workers = workers
+
+        # Connections are reused across requests and refreshes
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept"] = "application/vnd.github+json"
+
+        self._responses: Dict[str, Fetched] = {}
+        # (remaining requests, reset timestamp) as reported by the last response
+        self._rate_limit: Optional[Tuple[int, float]] = None
+        self._lock = Lock()
 
         self._repos: List[Repo] = []
         self.repo_last_retrieve: float = -1.0
-        self.org_last_retrieve: float = -1.0
+        # Seconds between refreshes, stretched beyond `refresh_delay` if the rate
+        # limit would be exhausted otherwise
+        self.interval: float = refresh_delay
+        # Incremented (and `last_modified` updated) whenever `repos` changes
+        self.generation = 0
+        self.last_modified: float = -1.0
+
+        self.store = store
+        # Set while stored repos are served, until they're replaced by fetched ones
+        # or expire
+        self._stored: Optional[Stored[Repo]] = None
+        self._repos_lock = Lock()
+
+        stored = store.load() if store is not None else None
+        if stored is not None:
+            self._repos = stored.items
+            self._stored = stored
+            # Stored repos are refreshed just like fetched ones would be
+            self.repo_last_retrieve = stored.retrieved
+            self.last_modified = stored.retrieved
+            self.generation += 1
+
+    # Seconds until stored repos expire (unless they're replaced before)
+    def expires_in(self) -> float:
+        stored = self._stored
+        if self.store is None or stored is None:
+            return float("inf")
+        return self.store.expires_in(stored)
+
+    # Stops serving stored repos once they're too old, called by the scheduler
+    # (reading `repos` never changes anything)
+    def expire(self) -> None:
+        stored = self._stored
+        if self.store is None or stored is None or not self.store.expired(stored):
+            return
+
+        with self._repos_lock:
+            # Fetched repos might have replaced them in the meantime
+            if self._stored is stored:
+                warning("stored repos expired, no fetch succeeded in time")
+                self._repos = []
+                self._stored = None
+                self.last_modified = time()
+                self.generation += 1
 
     @property
     def repos(self) -> List[Repo]:
-        if not self.disable_fetch:
-            if (self.repo_last_retrieve + self.refresh_delay) < time():
-                self.repo_last_retrieve = time()
-                start_new_thread(self._fetch_repos, ())
         return self._repos
 
-    def _fetch_repos(self) -> None:
+    # Fetches synchronously, regardless of `interval`
+    def refresh(self) -> bool:
+        self.repo_last_retrieve = time()
+        return self._fetch_repos()
+
+    def due_in(self) -> float:
+        return max(self.repo_last_retrieve + self.interval - time(), 0.0)
+
+    def _observe_rate_limit(self, response: Response) -> None:
+        try:
+            rate_limit = (
+                int(response.headers["X-RateLimit-Remaining"]),
+                float(response.headers["X-RateLimit-Reset"]),
+            )
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            self._rate_limit = rate_limit
+
+    # Returns `None` if GitHub is offline, the network connection is cut, or the
+    # rate limit is exhausted
+    def _get(self, url: str) -> Optional[Fetched]:
+        cached = self._responses.get(url, None)
+        headers = (
+            {"If-None-Match": cached.etag}
+            if cached is not None and cached.etag is not None
+            else {}
+        )
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=TIMEOUT)
+        except (gaierror, IOError):
+            return None
+
+        self._observe_rate_limit(response)
+
+        if response.status_code == 304 and cached is not None:
+            return cached
+        if response.status_code != 200:
+            return None
+
+        try:
+            fetched = Fetched(
+                response.headers.get("ETag", None), response.json(), last_page(response)
+            )
+        except ValueError:
+            return None
+
+        self._responses[url] = fetched
+        return fetched
+
+    def _page_url(self, path: str, page: int) -> str:
+        return f"{self.base_url}{path}?per_page={PER_PAGE}&page={page}"
+
+    # Every page after the first one is fetched concurrently
+    def _get_all(self, path: str, pages: ThreadPoolExecutor) -> Optional[List[Dict]]:
+        first = self._get(self._page_url(path, 1))
+        if first is None:
+            return None
+
+        rest = pages.map(
+            lambda page: self._get(self._page_url(path, page)),
+            range(2, first.last_page + 1),
+        )
+
+        items = []
+        for fetched in [first, *rest]:
+            if fetched is None or not isinstance(fetched.body, list):
+                return None
+            items.extend(fetched.body)
+
+        return items
+
+    def _get_repo(self, name: str) -> Optional[List[Dict]]:
+        fetched = self._get(f"{self.base_url}/repos/{name}")
+        if fetched is None or not isinstance(fetched.body, dict):
+            return None
+        return [fetched.body]
+
+    # Repos of every org are fetched concurrently. Must be called from outside of
+    # `sources`, waiting for its futures on one of its threads could deadlock.
+    def _get_org_repos(
+        self, sources: ThreadPoolExecutor, pages: ThreadPoolExecutor
+    ) -> Optional[List[Dict]]:
+        orgs = sources.submit(self._get_all, f"/users/{self.user}/orgs", pages).result()
+        if orgs is None:
+            return None
+
+        org_repos = [
+            sources.submit(self._get_all, f"/orgs/{org['login']}/repos", pages)
+            for org in orgs
+        ]
+
         repos = []
-        archived = []
-        for repo in get("https://api.github.com/users/%s/repos" % self.user).json():
-            repo = Repo(
-                *[
-                    repo["html_url"],
-                    repo["name"],
-                    repo["watchers_count"],
-                    repo["stargazers_count"],
-                    repo["fork"],
-                    repo["archived"],
-                    repo["description"],
-                    repo["forks"],
-                    repo["language"],
-                ]
+        for future in org_repos:
+            repos_ = future.result()
+            if repos_ is None:
+                return None
+            repos.extend(repos_)
+
+        return repos
+
+    # Spreads the remaining requests evenly until the rate limit is reset
+    def _adapt_interval(self, requests: int) -> None:
+        with self._lock:
+            rate_limit = self._rate_limit
+
+        if rate_limit is None:
+            self.interval = self.refresh_delay
+            return
+
+        remaining, reset = rate_limit
+        until_reset = max(reset - time(), 0.0)
+        refreshes = remaining // max(requests, 1)
+
+        interval = until_reset if refreshes == 0 else until_reset / refreshes
+        self.interval = max(float(self.refresh_delay), interval)
+
+        if refreshes == 0:
+            warning(
+                f"GitHub rate limit exhausted, next refresh in {self.interval:.0f}s"
             )
-            if not repo.fork:
+        elif self.interval > self.refresh_delay:
+            info(
+                f"{remaining} GitHub requests left, refreshing every {self.interval:.0f}s"
+            )
+
+    # Returns whether every request succeeded
+    def _fetch_repos(self) -> bool:
+        # Every URL is requested once per refresh
+        requests = len(self._responses)
+
+        # Sources wait for their pages, which therefore can't share an executor
+        # without risking a deadlock
+        with ThreadPoolExecutor(self.workers) as sources, ThreadPoolExecutor(
+            self.workers
+        ) as pages:
+            user = sources.submit(self._get_all, f"/users/{self.user}/repos", pages)
+            additional = [
+                sources.submit(self._get_repo, name) for name in self.additional_repos
+            ]
+            # Submitted after the other sources, which are fetched in the meantime
+            org_repos = self._get_org_repos(sources, pages) if self.include_orgs else []
+
+            user_repos = user.result()
+            additional_repos = [future.result() for future in additional]
+
+        self._adapt_interval(max(requests, len(self._responses)))
+
+        # Partial results would cause repos to vanish from the home page
+        if (
+            user_repos is None
+            or org_repos is None
+            or any(repos is None for repos in additional_repos)
+        ):
+            return False
+
+        repos = []
+        archived = []
+        seen = set()
+
+        # Explicitly listed repos come first, they take precedence over duplicates
+        for repo_, explicit in [
+            *((repo_, True) for repos_ in additional_repos for repo_ in repos_ or []),
+            *((repo_, False) for repo_ in user_repos + org_repos),
+        ]:
+            repo = Repo.new(repo_)
+            if repo.url in seen:
+                continue
+            seen.add(repo.url)
+
+            # Explicitly listed repos are shown even if they're forks
+            if not repo.fork or explicit:
                 if not repo.archived:
                     repos.append(repo)
                 else:
@@ -101,4 +354,15 @@ class GitHub:
         if len(repos) > 0:
             combined = sorted(repos, reverse=True) + sorted(archived, reverse=True)
 
-            self._repos = combined
+            with self._repos_lock:
+                self._stored = None
+
+                if combined != self._repos:
+                    self._repos = combined
+                    self.last_modified = time()
+                    self.generation += 1
+
+            if self.store is not None:
+                self.store.save(combined, time())
+
+        return True
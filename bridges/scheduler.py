@@ -0,0 +1,169 @@
+from asyncio import get_running_loop
+from asyncio import shield
+from asyncio import sleep
+from asyncio import Task
+from dataclasses import dataclass
+from random import uniform  # nosec
+from time import perf_counter
+from time import time
+from typing import Dict
+from typing import Optional
+from typing import Protocol
+
+from bridges.blog.util import warning
+
+# Delays are randomized by up to this fraction, so that bridges (or instances of
+# the app) don't refresh in lockstep
+JITTER = 0.1
+# Delay after the first failed refresh, doubled with every consecutive failure
+BACKOFF = 30.0
+MAX_BACKOFF = 3600.0
+
+
+class Bridge(Protocol):
+    # Fetches synchronously, returns whether the fetch succeeded
+    def refresh(self) -> bool:
+        ...
+
+    # Seconds until the data should be refreshed
+    def due_in(self) -> float:
+        ...
+
+    # Seconds until the data is too old to be served (e.g. restored from a store)
+    def expires_in(self) -> float:
+        ...
+
+    # Stops serving data that is too old
+    def expire(self) -> None:
+        ...
+
+
+@dataclass(frozen=True)
+class BridgeStats:
+    fetches: int
+    failed: int
+    # Seconds spent fetching, in total and during the last fetch
+    duration: float
+    last_duration: float
+    # Unix time of the last successful fetch, `None` if there wasn't one yet
+    last_success: Optional[float]
+
+
+@dataclass
+class _Entry:
+    bridge: Bridge
+    # Consecutive failures
+    failures: int = 0
+    fetches: int = 0
+    failed: int = 0
+    duration: float = 0.0
+    last_duration: float = 0.0
+    last_success: Optional[float] = None
+    # Awaited by everyone waiting for the refresh that is currently running
+    in_flight: "Optional[Task[bool]]" = None
+    periodic: "Optional[Task[None]]" = None
+
+
+# Owns the refreshes of every bridge. Refreshes run in the default executor of
+# the event loop (bridges fetch synchronously), reading bridge data therefore
+# never triggers anything.
+class Scheduler:
+    def __init__(
+        self,
+        jitter: float = JITTER,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+    ) -> None:
+        self.jitter = jitter
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._entries: Dict[str, _Entry] = {}
+
+    def add(self, name: str, bridge: Bridge) -> None:
+        self._entries[name] = _Entry(bridge)
+
+    # Has to be called from within the event loop
+    def start(self) -> None:
+        loop = get_running_loop()
+
+        for name, entry in self._entries.items():
+            if entry.periodic is None:
+                entry.periodic = loop.create_task(self._run(name, entry))
+
+    def stop(self) -> None:
+        for entry in self._entries.values():
+            if entry.periodic is not None:
+                entry.periodic.cancel()
+                entry.periodic = None
+
+    # Single-flight, concurrent callers wait for the same refresh
+    async def refresh(self, name: str) -> bool:
+        entry = self._entries[name]
+
+        if entry.in_flight is None:
+            entry.in_flight = get_running_loop().create_task(self._refresh(name, entry))
+
+        # Callers being cancelled must not cancel the refresh itself
+        return await shield(entry.in_flight)
+
+    def stats(self) -> Dict[str, BridgeStats]:
+        return {
+            name: BridgeStats(
+                entry.fetches,
+                entry.failed,
+                entry.duration,
+                entry.last_duration,
+                entry.last_success,
+            )
+            for name, entry in self._entries.items()
+        }
+
+    async def _refresh(self, name: str, entry: _Entry) -> bool:
+        start = perf_counter()
+        succeeded = False
+
+        try:
+            succeeded = await get_running_loop().run_in_executor(
+                None, entry.bridge.refresh
+            )
+        except Exception as e:
+            warning(f"refreshing {name} failed: {e!r}")
+            return False
+        finally:
+            entry.in_flight = None
+
+            entry.last_duration = perf_counter() - start
+            entry.duration += entry.last_duration
+            entry.fetches += 1
+            if succeeded:
+                entry.last_success = time()
+            else:
+                entry.failed += 1
+
+        if not succeeded:
+            warning(f"refreshing {name} failed")
+        return succeeded
+
+    def _delay(self, entry: _Entry, succeeded: bool) -> float:
+        if succeeded:
+            entry.failures = 0
+            delay = entry.bridge.due_in()
+        else:
+            entry.failures += 1
+            delay = min(self.backoff * 2 ** (entry.failures - 1), self.max_backoff)
+
+        return max(delay * uniform(1 - self.jitter, 1 + self.jitter), 0.0)  # nosec
+
+    async def _run(self, name: str, entry: _Entry) -> None:
+        loop = get_running_loop()
+        # Bridges restored from a store might not be due yet
+        due = loop.time() + max(entry.bridge.due_in(), 0.0)
+
+        while True:
+            # Data might expire before the next refresh (e.g. after failures)
+            await sleep(max(min(due - loop.time(), entry.bridge.expires_in()), 0.0))
+            entry.bridge.expire()
+
+            if loop.time() >= due:
+                due = loop.time() + self._delay(entry, await self.refresh(name))
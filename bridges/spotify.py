@@ -1,11 +1,39 @@
-from _thread import start_new_thread  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from threading import Lock
 from time import time
+from typing import Dict
 from typing import List
 from typing import Optional
 
 from spotipy import Spotify as Spotipy
 
+from bridges.blog.util import warning
+from bridges.store import Store
+from bridges.store import Stored
+
+# Maximum allowed by the API
+PAGE_SIZE = 50
+# Upper bound for concurrent requests
+WORKERS = 4
+# Width (in CSS pixels) of `.playlist-cover` in `src/style/home.css`
+COVER_SIZE = 200
+
+
+# Spotify lists images largest first, sizes are unknown for some playlists
+def smallest_fitting(images: List[Dict], size: int) -> Optional[str]:  # type: ignore
+    if len(images) == 0:
+        return None
+
+    sized = [image for image in images if image.get("width", None) is not None]
+    fitting = [image for image in sized if image["width"] >= size]
+
+    if len(fitting) > 0:
+        return min(fitting, key=lambda image: image["width"])["url"]  # type: ignore
+    if len(sized) > 0:
+        return max(sized, key=lambda image: image["width"])["url"]  # type: ignore
+    return images[0]["url"]  # type: ignore
+
 
 @dataclass
 class Playlist:
@@ -21,42 +49,106 @@ class Spotify:
         spotify: Spotipy,
         refresh_delay: int = 3600,
         disable_fetch: bool = False,
+        # Playlists are persisted in and restored from this store
+        store: Optional[Store[Playlist]] = None,
+        # Images narrower than this (in pixels) are only used if there's no other
+        cover_size: int = COVER_SIZE,
+        workers: int = WORKERS,
     ) -> None:
         self.user = user
         self.sp = spotify
 
         self.refresh_delay = refresh_delay
         self.disable_fetch = disable_fetch
+        self.cover_size = cover_size
+        self.workers = workers
 
         self._playlists: List[Playlist] = []
         self.last_retrieve: float = -1.0
+        # Incremented (and `last_modified` updated) whenever `playlists` changes
+        self.generation = 0
+        self.last_modified: float = -1.0
+
+        self.store = store
+        # Set while stored playlists are served, until they're replaced by fetched
+        # ones or expire
+        self._stored: Optional[Stored[Playlist]] = None
+        self._playlists_lock = Lock()
+
+        stored = store.load() if store is not None else None
+        if stored is not None:
+            self._playlists = stored.items
+            self._stored = stored
+            # Stored playlists are refreshed just like fetched ones would be
+            self.last_retrieve = stored.retrieved
+            self.last_modified = stored.retrieved
+            self.generation += 1
+
+    # Seconds until stored playlists expire (unless they're replaced before)
+    def expires_in(self) -> float:
+        stored = self._stored
+        if self.store is None or stored is None:
+            return float("inf")
+        return self.store.expires_in(stored)
+
+    # Stops serving stored playlists once they're too old, called by the scheduler
+    # (reading `playlists` never changes anything)
+    def expire(self) -> None:
+        stored = self._stored
+        if self.store is None or stored is None or not self.store.expired(stored):
+            return
+
+        with self._playlists_lock:
+            # Fetched playlists might have replaced them in the meantime
+            if self._stored is stored:
+                warning("stored playlists expired, no fetch succeeded in time")
+                self._playlists = []
+                self._stored = None
+                self.last_modified = time()
+                self.generation += 1
 
     @property
     def playlists(self) -> List[Playlist]:
-        if not self.disable_fetch:
-            if (self.last_retrieve + self.refresh_delay) < time():
-                self.last_retrieve = time()
-                start_new_thread(self._fetch_playlists, ())
         return self._playlists
 
+    def refresh(self) -> bool:
+        self.last_retrieve = time()
+        self._fetch_playlists()
+        return True
+
+    def due_in(self) -> float:
+        return max(self.last_retrieve + self.refresh_delay - time(), 0.0)
+
+    def _fetch_page(self, offset: int) -> Dict:  # type: ignore
+        return self.sp.user_playlists(  # type: ignore
+            self.user, limit=PAGE_SIZE, offset=offset
+        )
+
+    # Every page after the first one is fetched concurrently
     def _fetch_playlists(self) -> None:
-        playlists = self.sp.user_playlists(self.user)
-        playlists_ = []
-
-        while playlists:
-            for playlist in playlists["items"]:
-                playlists_.append(
-                    Playlist(
-                        playlist["name"],
-                        playlist["external_urls"]["spotify"],
-                        playlist["images"][0]["url"]
-                        if len(playlist["images"]) > 0
-                        else None,
-                    )
-                )
-            if playlists["next"]:
-                playlists = self.sp.next(playlists)
-            else:
-                playlists = None
-
-        self._playlists = playlists_
+        first = self._fetch_page(0)
+        offsets = range(PAGE_SIZE, first["total"], PAGE_SIZE)
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            pages = [first, *executor.map(self._fetch_page, offsets)]
+
+        playlists_ = [
+            Playlist(
+                playlist["name"],
+                playlist["external_urls"]["spotify"],
+                smallest_fitting(playlist["images"] or [], self.cover_size),
+            )
+            for page in pages
+            for playlist in page["items"]
+        ]
+
+        with self._playlists_lock:
+            self._stored = None
+
+            if playlists_ != self._playlists:
+                self._playlists = playlists_
+                self.last_modified = time()
+                self.generation += 1
+
+        if self.store is not None:
+            self.store.save(playlists_, time())
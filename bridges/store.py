@@ -0,0 +1,102 @@
+from dataclasses import asdict
+from dataclasses import dataclass
+from json import dumps
+from json import loads
+from os import replace as os_replace
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from time import time
+from typing import Generic
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Type
+from typing import TypeVar
+
+from bridges.blog.util import info
+from bridges.blog.util import warning
+
+# Has to be incremented whenever the shape of stored items changes
+STORE_VERSION = 1
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Stored(Generic[T]):
+    # Timestamp of the fetch the items were obtained with
+    retrieved: float
+    items: List[T]
+
+
+# Last good data of a bridge, which is served right after startup (while the
+# bridge is refreshed in the background)
+class Store(Generic[T]):
+    def __init__(
+        self,
+        path: Path,
+        # Items are constructed from their fields
+        new: Type[T],
+        # Seconds after which stored data is no longer served
+        max_age: float,
+    ) -> None:
+        self.path = path
+        self.new = new
+        self.max_age = max_age
+
+    def load(self) -> Optional[Stored[T]]:
+        try:
+            raw = loads(self.path.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            warning(f"discarding unreadable bridge store {self.path}: {e!r}")
+            return None
+
+        try:
+            if raw["version"] != STORE_VERSION:
+                return None
+
+            stored = Stored(
+                float(raw["retrieved"]), [self.new(**item) for item in raw["items"]]
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            warning(f"discarding invalid bridge store {self.path}: {e!r}")
+            return None
+
+        if self.expired(stored):
+            age = time() - stored.retrieved
+            info(f"{self.path} is too old to be served ({age:.0f}s)")
+            return None
+
+        return stored
+
+    # Stored items stop being served once they're too old, even if no fetch has
+    # succeeded since
+    def expires_in(self, stored: Stored[T]) -> float:
+        return stored.retrieved + self.max_age - time()
+
+    def expired(self, stored: Stored[T]) -> bool:
+        return self.expires_in(stored) < 0
+
+    # `items` have to be dataclasses
+    def save(self, items: Sequence[T], retrieved: float) -> None:
+        content = dumps(
+            {
+                "version": STORE_VERSION,
+                "retrieved": retrieved,
+                "items": [asdict(item) for item in items],  # type: ignore
+            }
+        )
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Written to a temporary file first, a crash never leaves a partially
+            # written store behind
+            with NamedTemporaryFile(
+                "w", dir=self.path.parent, suffix=".tmp", delete=False
+            ) as file:
+                file.write(content)
+            os_replace(file.name, self.path)
+        except OSError as e:
+            warning(f"could not write bridge store {self.path}: {e!r}")
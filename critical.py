@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# Extracts the critical rules of the stylesheets of every template, which are
+# inlined into pages, while the stylesheets are loaded externally (`python3
+# critical.py`, after `make build`). Rules are critical if they apply to an element
+# above the fold of any page rendered from the template. Templates inline their
+# complete stylesheets until this was run.
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from dataclasses import replace
+from gzip import compress as gzip_compress
+from hashlib import sha256
+from json import dumps
+from json import loads
+from pathlib import Path
+from re import compile as re_compile
+from re import DOTALL
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString
+from bs4.element import Tag
+from soupsieve import SelectorSyntaxError
+
+from bridges.blog.util import info
+from bridges.blog.util import Url
+from bridges.blog.util import warning
+
+DIST_PATH = Path("dist")
+CRITICAL_FOLDER = "critical"
+MANIFEST = "manifest.json"
+# Has to be incremented whenever the shape of the manifest changes
+MANIFEST_VERSION = 1
+
+# Characters of text (in document order) considered to be above the fold
+FOLD = 1500
+
+
+@dataclass(frozen=True)
+class Template:
+    # Stylesheets (relative to the template search path), in cascade order
+    sheets: Tuple[str, ...]
+    # Bytes of critical CSS a page can afford to inline (reported at build time)
+    budget: int
+
+
+TEMPLATES: Dict[str, Template] = {
+    "base": Template(("style/base.css",), 8 * 1024),
+    "home": Template(("style/base.css", "style/home.css"), 8 * 1024),
+    "blog-post": Template(
+        (
+            "style/base.css",
+            "style/github-markdown-processed.css",
+            "style/github.css",
+            "style/blog-post.css",
+        ),
+        12 * 1024,
+    ),
+    "blog-tag": Template(("style/base.css", "style/blog-tag.css"), 8 * 1024),
+}
+
+# At-rules containing other rules, every other at-rule is kept as is
+GROUPING_AT_RULES = ("@media", "@supports", "@container", "@layer")
+
+COMMENT = re_compile(r"/\*.*?\*/", DOTALL)
+# Pseudo-classes depending on user interaction and pseudo-elements, selectors are
+# matched against the element they're attached to
+DYNAMIC_PSEUDO = re_compile(
+    r"::?(?:-[a-z]+-)?(?:hover|focus|focus-visible|focus-within|active|visited|"
+    r"target|before|after|first-line|first-letter|placeholder|selection|marker|"
+    r"backdrop|scrollbar[a-z-]*|[a-z-]+-inner-spin-button|[a-z-]+-outer-spin-button|"
+    r"[a-z-]+-search-decoration|[a-z-]+-file-upload-button|details-marker)"
+    r"(?:\([^)]*\))?"
+)
+
+
+@dataclass(frozen=True)
+class Rule:
+    # Selectors of style rules, the prelude (including the at-keyword) otherwise
+    prelude: str
+    # Declarations, `None` for statements (e.g. `@import`) and grouping at-rules
+    body: Optional[str] = None
+    children: Tuple["Rule", ...] = ()
+
+    def __str__(self) -> str:
+        if self.prelude.startswith(GROUPING_AT_RULES):
+            return "%s{%s}" % (self.prelude, serialize(self.children))
+        if self.body is None:
+            return f"{self.prelude};"
+        return "%s{%s}" % (self.prelude, self.body)
+
+
+def serialize(rules: Iterable[Rule]) -> str:
+    return "".join(str(rule) for rule in rules)
+
+
+# Index of the first of `stops` outside of strings, parentheses and nested blocks
+def _scan(css: str, start: int, stops: str) -> int:
+    depth = 0
+    quote: Optional[str] = None
+    index = start
+
+    while index < len(css):
+        character = css[index]
+
+        if quote is not None:
+            if character == "\\":
+                index += 1
+            elif character == quote:
+                quote = None
+        elif character in "\"'":
+            quote = character
+        elif depth == 0 and character in stops:
+            return index
+        elif character in "([{":
+            depth += 1
+        elif character in ")]}":
+            depth -= 1
+        index += 1
+
+    return len(css)
+
+
+def _parse(css: str, start: int) -> Tuple[List[Rule], int]:
+    rules: List[Rule] = []
+    index = start
+
+    while True:
+        while index < len(css) and css[index].isspace():
+            index += 1
+        if index >= len(css):
+            return rules, index
+        if css[index] == "}":
+            return rules, index + 1
+
+        end = _scan(css, index, "{;}")
+        prelude = css[index:end].strip()
+
+        if end >= len(css) or css[end] in ";}":
+            if prelude:
+                rules.append(Rule(prelude))
+            index = end + 1 if end < len(css) and css[end] == ";" else end
+        elif prelude.startswith(GROUPING_AT_RULES):
+            children, index = _parse(css, end + 1)
+            rules.append(Rule(prelude, children=tuple(children)))
+        else:
+            close = _scan(css, end + 1, "}")
+            rules.append(Rule(prelude, css[end + 1 : close].strip()))
+            index = close + 1
+
+
+def parse(css: str) -> List[Rule]:
+    return _parse(COMMENT.sub("", css), 0)[0]
+
+
+# Splits a selector list on commas that aren't nested in functional notation
+def _selectors(prelude: str) -> List[str]:
+    selectors = []
+    start = 0
+
+    while start <= len(prelude):
+        end = _scan(prelude, start, ",")
+        selectors.append(prelude[start:end].strip())
+        start = end + 1
+
+    return [selector for selector in selectors if selector]
+
+
+class Pages:
+    # `pages` are HTML documents rendered from the same template
+    def __init__(self, pages: Iterable[bytes]) -> None:
+        self.documents = []
+        # Identities of the elements above the fold of every document
+        self.above: Set[int] = set()
+
+        for page in pages:
+            document = BeautifulSoup(page, "html.parser")
+            self.documents.append(document)
+
+            root = document.find("html")
+            body = document.find("body")
+            if not isinstance(root, Tag) or not isinstance(body, Tag):
+                continue
+
+            self.above.update((id(root), id(body)))
+            text = 0
+            for node in body.descendants:
+                if text >= FOLD:
+                    break
+                if isinstance(node, Tag):
+                    self.above.add(id(node))
+                # Excludes comments, scripts and styles (which are subclasses)
+                elif type(node) is NavigableString:
+                    text += len(node.strip())
+
+    # `None` if the selector couldn't be evaluated
+    def above_fold(self, selector: str) -> Optional[bool]:
+        simplified = DYNAMIC_PSEUDO.sub("", selector).strip() or "*"
+
+        try:
+            return any(
+                id(element) in self.above
+                for document in self.documents
+                for element in document.select(simplified)
+            )
+        except (SelectorSyntaxError, NotImplementedError):
+            return None
+
+
+@dataclass(frozen=True)
+class Critical:
+    rules: List[Rule]
+    # Selectors that couldn't be evaluated (and were therefore kept critical)
+    unknown: List[str]
+
+
+def extract(rules: Iterable[Rule], pages: Pages) -> Critical:
+    critical = []
+    unknown = []
+
+    for rule in rules:
+        if rule.prelude.startswith(GROUPING_AT_RULES):
+            nested = extract(rule.children, pages)
+            if nested.rules:
+                critical.append(replace(rule, children=tuple(nested.rules)))
+            unknown.extend(nested.unknown)
+        # `@font-face`, `@keyframes`, `@import`, ...
+        elif rule.prelude.startswith("@"):
+            critical.append(rule)
+        else:
+            results = [
+                (selector, pages.above_fold(selector))
+                for selector in _selectors(rule.prelude)
+            ]
+            unknown.extend(selector for selector, above in results if above is None)
+
+            if any(above is not False for _, above in results):
+                critical.append(rule)
+
+    return Critical(critical, unknown)
+
+
+def _digest(content: bytes) -> str:
+    return sha256(content).hexdigest()
+
+
+@dataclass(frozen=True)
+class Styles:
+    # Stylesheets inlined into pages (relative to the template search path)
+    inline: Tuple[str, ...]
+    # URL of the complete stylesheet, loaded without blocking rendering
+    stylesheet: Optional[str] = None
+
+
+# Looked up by templates (`critical_css("home")`), falls back to inlining every
+# stylesheet if the split is missing or outdated
+class CriticalCss:
+    # The manifest is read (and the stylesheets it was generated from verified)
+    # once, and again on `reload` (along with templates, see `app.py`)
+    def __init__(self, url: Url, path: Path = DIST_PATH) -> None:
+        self.url = url
+        self.path = path
+
+        self._styles: Dict[str, Styles] = {}
+        self.reload()
+
+    def _manifest(self) -> Dict[str, Dict[str, object]]:
+        try:
+            manifest = loads((self.path / CRITICAL_FOLDER / MANIFEST).read_text())
+        except (OSError, ValueError):
+            return {}
+
+        if manifest.get("version", None) != MANIFEST_VERSION:
+            return {}
+        return manifest.get("templates", {})  # type: ignore
+
+    def _current(self, sources: Dict[str, str]) -> bool:
+        for sheet, digest in sources.items():
+            try:
+                if _digest((self.path / sheet).read_bytes()) != digest:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def reload(self) -> None:
+        styles = {}
+
+        for name, entry in self._manifest().items():
+            if name in TEMPLATES and self._current(entry["sources"]):  # type: ignore
+                styles[name] = Styles(
+                    (str(entry["critical"]),),
+                    str(self.url / str(entry["stylesheet"])),
+                )
+
+        # Replaced as a whole, renders never see a partially loaded manifest
+        self._styles = styles
+
+    def __call__(self, name: str) -> Styles:
+        styles = self._styles.get(name, None)
+        return styles if styles is not None else Styles(TEMPLATES[name].sheets)
+
+
+def _pages() -> Dict[str, List[bytes]]:
+    # Renders the site, only required at build time
+    import app as site
+    from export import blog_pages
+    from export import home_page
+    from export import INDEX
+
+    pages: Dict[str, List[bytes]] = {name: [] for name in TEMPLATES}
+
+    for path, page in {**home_page(), **blog_pages(site.blog.snapshot)}.items():
+        if path == INDEX:
+            pages["home"].append(page.body)
+        elif path.startswith(f"{site.RSS_POST_ROUTE_PARTIAL}/"):
+            pages["blog-post"].append(page.body)
+        elif path.startswith(f"{site.TAG_ROUTE_PARTIAL}/"):
+            pages["blog-tag"].append(page.body)
+
+    site.blog.observer.stop()
+    return pages
+
+
+def build(path: Path, strict: bool) -> bool:
+    rendered = _pages()
+    target = path / CRITICAL_FOLDER
+    target.mkdir(parents=True, exist_ok=True)
+
+    manifest = {}
+    within_budget = True
+
+    for name, template in TEMPLATES.items():
+        # Pages of templates without rendered pages inline every stylesheet
+        if len(rendered.get(name, [])) == 0:
+            info(f"{name}: no pages, skipped")
+            continue
+
+        sources = {sheet: (path / sheet).read_bytes() for sheet in template.sheets}
+        rules = [
+            rule for content in sources.values() for rule in parse(content.decode())
+        ]
+
+        result = extract(rules, Pages(rendered.get(name, [])))
+        critical = serialize(result.rules).encode()
+        # Contains the critical rules as well, splitting rules between two
+        # stylesheets would change their order in the cascade
+        complete = serialize(rules).encode()
+
+        (target / f"{name}.css").write_bytes(critical)
+        (target / f"{name}.all.css").write_bytes(complete)
+        manifest[name] = {
+            "critical": f"{CRITICAL_FOLDER}/{name}.css",
+            "stylesheet": f"{CRITICAL_FOLDER}/{name}.all.css",
+            "sources": {sheet: _digest(content) for sheet, content in sources.items()},
+        }
+
+        info(
+            "{}: {} pages, {} of {} bytes inlined ({} gzipped), budget {}".format(
+                name,
+                len(rendered.get(name, [])),
+                len(critical),
+                sum(len(content) for content in sources.values()),
+                len(gzip_compress(critical, 9, mtime=0)),
+                template.budget,
+            )
+        )
+        for selector in sorted(set(result.unknown)):
+            warning(f"{name}: could not evaluate `{selector}`, kept critical")
+        if len(critical) > template.budget:
+            warning(f"{name}: critical CSS exceeds budget of {template.budget} bytes")
+            within_budget = False
+
+    (target / MANIFEST).write_text(
+        dumps({"version": MANIFEST_VERSION, "templates": manifest}, indent=2)
+    )
+
+    return within_budget or not strict
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Split stylesheets into critical CSS")
+    parser.add_argument(
+        "--path", type=Path, default=DIST_PATH, help="built stylesheets (`dist`)"
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="fail if critical CSS of a template exceeds its budget",
+    )
+    arguments = parser.parse_args()
+
+    if not build(arguments.path, arguments.strict):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# Writes every route of the site to disk, which allows nginx to serve it without the
+# app on the request path (see `docker/web/export.conf`)
+from argparse import ArgumentParser
+from os import replace as os_replace
+from pathlib import Path
+from shutil import rmtree
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import sleep
+from typing import Dict
+
+import app as site
+from bridges.blog.page import EPOCH
+from bridges.blog.page import Page
+from bridges.blog.snapshot import Snapshot
+from bridges.blog.util import info
+from bridges.blog.util import warning
+
+INDEX = "index.html"
+NOT_FOUND = "404.html"
+GZIP_SUFFIX = ".gz"
+
+
+def home_page() -> Dict[str, Page]:
+    return {INDEX: site.home_page.get()}
+
+
+def blog_pages(snapshot: Snapshot) -> Dict[str, Page]:
+    pages = {
+        f"{site.RSS_POST_ROUTE_PARTIAL}/{NOT_FOUND}": Page.new(
+            site.render_post(None).encode(), EPOCH
+        ),
+        f"{site.TAG_ROUTE_PARTIAL}/{NOT_FOUND}": Page.new(
+            site.render_tag("", ()).encode(), EPOCH
+        ),
+        site.RSS_ROUTE: snapshot.rss,
+        site.ATOM_ROUTE: snapshot.atom,
+        site.JSON_FEED_ROUTE: snapshot.json_feed,
+    }
+
+    for name, page in snapshot.post_pages.items():
+        pages[f"{site.RSS_POST_ROUTE_PARTIAL}/{name}/{INDEX}"] = page
+    for tag, page in snapshot.tag_pages.items():
+        pages[f"{site.TAG_ROUTE_PARTIAL}/{tag}/{INDEX}"] = page
+
+    return pages
+
+
+class Exporter:
+    def __init__(self, target: Path, compress: bool) -> None:
+        self.target = target
+        self.compress = compress
+
+        # Blog refreshes and bridge refreshes export from different threads
+        self._lock = Lock()
+
+    def _write(self, path: Path, content: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Replaced atomically, nginx never serves partially written files
+        with NamedTemporaryFile(dir=path.parent, delete=False) as file:
+            file.write(content)
+        Path(file.name).chmod(0o644)
+        os_replace(file.name, path)
+
+    # Only pages that actually changed are written
+    def export(self, pages: Dict[str, Page]) -> int:
+        written = 0
+
+        with self._lock:
+            for relative_path, page in pages.items():
+                path = self.target / relative_path
+
+                if path.exists() and path.read_bytes() == page.body:
+                    continue
+
+                self._write(path, page.body)
+                if self.compress:
+                    compressed = path.with_name(path.name + GZIP_SUFFIX)
+                    # Pages are compressed once they're built, variants are
+                    # omitted if compressing isn't worth it
+                    gzip = page.variants.get("gzip", None)
+                    if gzip is not None:
+                        self._write(compressed, gzip)
+                    elif compressed.exists():
+                        compressed.unlink()
+                written += 1
+
+        return written
+
+    # Removes pages of posts and tags that no longer exist
+    def prune(self, pages: Dict[str, Page]) -> None:
+        keep = {(self.target / path).parent for path in pages}
+
+        with self._lock:
+            for partial in (site.RSS_POST_ROUTE_PARTIAL, site.TAG_ROUTE_PARTIAL):
+                directory = self.target / partial
+                if not directory.is_dir():
+                    continue
+
+                for path in directory.iterdir():
+                    if path.is_dir() and path not in keep:
+                        rmtree(path)
+
+    # The home page lists blog posts and is therefore exported as well
+    def export_blog(self, snapshot: Snapshot) -> None:
+        pages = {**home_page(), **blog_pages(snapshot)}
+        written = self.export(pages)
+        self.prune(pages)
+
+        info(f"Exported {written} changed page(s)")
+
+    def export_home(self) -> None:
+        if self.export(home_page()) > 0:
+            info("Exported home page")
+
+
+def refresh_bridges() -> None:
+    for name, bridge in (("GitHub", site.github), ("Spotify", site.spotify)):
+        if bridge is None:
+            continue
+
+        try:
+            succeeded = bridge.refresh()
+        except Exception as e:
+            warning(f"refreshing {name} failed: {e!r}")
+        else:
+            if not succeeded:
+                warning(f"refreshing {name} failed")
+
+        # There's no scheduler doing so
+        bridge.expire()
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Export every route of the site to disk")
+    parser.add_argument("target", type=Path, help="directory pages are written to")
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write precompressed (gzip) siblings for `gzip_static`",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and re-export pages once the blog or bridges change",
+    )
+    parser.add_argument(
+        "--bridge-interval",
+        type=float,
+        default=3600.0,
+        help="seconds between bridge refreshes in watch mode",
+    )
+    arguments = parser.parse_args()
+
+    exporter = Exporter(arguments.target, arguments.compress)
+
+    refresh_bridges()
+    exporter.export_blog(site.blog.snapshot)
+
+    if arguments.watch:
+        site.blog.subscribe(exporter.export_blog)
+
+        try:
+            while True:
+                sleep(arguments.bridge_interval)
+                refresh_bridges()
+                exporter.export_home()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# Metrics of the app in the Prometheus text format. Apart from request durations,
+# values are collected from the components themselves whenever metrics are
+# requested, nothing is recorded on their behalf.
+from bisect import bisect_left
+from threading import Lock
+from time import time
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from bridges.blog import Blog
+from bridges.blog.markdown import pool_stats
+from bridges.blog.markdown import render
+from bridges.scheduler import Scheduler
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "pt_"
+# Upper bounds (in seconds) of request duration buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Mapping[str, str]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    def __init__(self) -> None:
+        self._lines: List[str] = []
+
+    def family(self, name: str, kind: str, description: str) -> None:
+        self._lines.append(f"# HELP {PREFIX}{name} {description}")
+        self._lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Optional[Labels] = None) -> None:
+        rendered = ",".join(
+            '{}="{}"'.format(key, _escape(label))
+            for key, label in (labels or {}).items()
+        )
+        self._lines.append(
+            f"{PREFIX}{name}{{{rendered}}} {_format(value)}"
+            if rendered
+            else f"{PREFIX}{name} {_format(value)}"
+        )
+
+    def metric(
+        self,
+        name: str,
+        kind: str,
+        description: str,
+        samples: Mapping[str, float],
+        label: str,
+    ) -> None:
+        self.family(name, kind, description)
+        for value, sample in sorted(samples.items()):
+            self.sample(name, sample, {label: value})
+
+    def text(self) -> str:
+        return "\n".join(self._lines) + "\n"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+
+        # Per label value: counts per bucket (not cumulative), sum
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._lock = Lock()
+
+    def observe(self, label: str, value: float) -> None:
+        # The last count belongs to the implicit `+Inf` bucket
+        index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            if label not in self._series:
+                self._series[label] = ([0] * (len(self.buckets) + 1), [0.0])
+
+            counts, total = self._series[label]
+            counts[index] += 1
+            total[0] += value
+
+    def expose(
+        self, exposition: Exposition, name: str, description: str, label: str
+    ) -> None:
+        with self._lock:
+            series = {
+                value: (list(counts), total[0])
+                for value, (counts, total) in self._series.items()
+            }
+
+        exposition.family(name, "histogram", description)
+        for value, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                exposition.sample(
+                    f"{name}_bucket", cumulative, {label: value, "le": _format(bound)}
+                )
+            exposition.sample(f"{name}_sum", total, {label: value})
+            exposition.sample(f"{name}_count", cumulative, {label: value})
+
+
+def _markdown(exposition: Exposition) -> None:
+    # Posts loaded by worker processes are rendered (and cached) there, only
+    # renders of the app process itself are reflected
+    cache = render.cache_info()
+    exposition.family(
+        "markdown_cache_hits_total", "counter", "Markdown renders served from cache"
+    )
+    exposition.sample("markdown_cache_hits_total", cache.hits)
+    exposition.family(
+        "markdown_cache_misses_total", "counter", "Markdown renders not in cache"
+    )
+    exposition.sample("markdown_cache_misses_total", cache.misses)
+    exposition.family("markdown_cache_entries", "gauge", "Cached Markdown renders")
+    exposition.sample("markdown_cache_entries", cache.currsize)
+
+    pool = pool_stats()
+    exposition.metric(
+        "markdown_pool_instances",
+        "gauge",
+        "Markdown instances of the render pool",
+        {
+            "idle": pool.idle,
+            "in_use": pool.in_use,
+            "unbuilt": pool.size - pool.created,
+        },
+        "state",
+    )
+    exposition.family(
+        "markdown_pool_overflow_total",
+        "counter",
+        "Temporary Markdown instances built because the pool was exhausted",
+    )
+    exposition.sample("markdown_pool_overflow_total", pool.overflow)
+    exposition.family(
+        "markdown_pool_discarded_total",
+        "counter",
+        "Markdown instances discarded because a render failed",
+    )
+    exposition.sample("markdown_pool_discarded_total", pool.discarded)
+
+
+def _blog(exposition: Exposition, blog: Blog) -> None:
+    snapshot = blog.snapshot
+    stats = blog.stats()
+
+    exposition.metric(
+        "blog_posts",
+        "gauge",
+        "Published posts",
+        {
+            "visible": len(snapshot.visible_posts),
+            "hidden": len(snapshot.posts) - len(snapshot.visible_posts),
+        },
+        "visibility",
+    )
+    exposition.family("blog_refresh_duration_seconds", "summary", "Blog refreshes")
+    exposition.sample("blog_refresh_duration_seconds_sum", stats.duration)
+    exposition.sample("blog_refresh_duration_seconds_count", stats.refreshes)
+    exposition.family(
+        "blog_last_refresh_duration_seconds", "gauge", "Duration of the last refresh"
+    )
+    exposition.sample("blog_last_refresh_duration_seconds", stats.last_duration)
+    exposition.metric(
+        "blog_posts_loaded_total",
+        "counter",
+        "Post folders loaded by refreshes, unchanged, restored from cache, or built",
+        stats.loaded,
+        "origin",
+    )
+    exposition.metric(
+        "blog_invalid_posts",
+        "gauge",
+        "Post folders that currently fail to load",
+        stats.failures,
+        "kind",
+    )
+
+
+def _bridges(exposition: Exposition, scheduler: Scheduler) -> None:
+    bridges = scheduler.stats()
+    now = time()
+
+    exposition.metric(
+        "bridge_fetches_total",
+        "counter",
+        "Bridge fetches",
+        {name: stats.fetches for name, stats in bridges.items()},
+        "bridge",
+    )
+    exposition.metric(
+        "bridge_failed_fetches_total",
+        "counter",
+        "Bridge fetches that failed",
+        {name: stats.failed for name, stats in bridges.items()},
+        "bridge",
+    )
+    exposition.metric(
+        "bridge_fetch_duration_seconds_total",
+        "counter",
+        "Seconds spent fetching",
+        {name: stats.duration for name, stats in bridges.items()},
+        "bridge",
+    )
+    exposition.metric(
+        "bridge_last_fetch_duration_seconds",
+        "gauge",
+        "Duration of the last fetch",
+        {name: stats.last_duration for name, stats in bridges.items() if stats.fetches},
+        "bridge",
+    )
+    exposition.metric(
+        "bridge_last_success_age_seconds",
+        "gauge",
+        "Seconds since the last successful fetch",
+        {
+            name: now - stats.last_success
+            for name, stats in bridges.items()
+            if stats.last_success is not None
+        },
+        "bridge",
+    )
+
+
+def expose(blog: Blog, scheduler: Scheduler, requests: Histogram) -> str:
+    exposition = Exposition()
+
+    requests.expose(
+        exposition, "request_duration_seconds", "Duration of requests", "route"
+    )
+    _markdown(exposition)
+    _blog(exposition, blog)
+    _bridges(exposition, scheduler)
+
+    return exposition.text()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Compiles templates ahead of time (`python3 templating.py build/template`), the
+# app loads the compiled modules instead of parsing templates on startup
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import List
+from typing import Optional
+
+from jinja2 import BaseLoader
+from jinja2 import ChoiceLoader
+from jinja2 import Environment
+from jinja2 import FileSystemBytecodeCache
+from jinja2 import FileSystemLoader
+from jinja2 import ModuleLoader
+
+from bridges.blog.util import info
+
+TEMPLATE_PATHS = [Path("template"), Path("dist")]
+
+
+def build_environment(
+    # Directory compiled templates were written to
+    module_path: Optional[Path] = None,
+    # Bytecode of templates compiled at runtime is persisted here
+    cache_path: Optional[Path] = None,
+    # Checks templates for modifications whenever they're used
+    auto_reload: bool = True,
+) -> Environment:
+    loaders: List[BaseLoader] = [
+        FileSystemLoader([str(path) for path in TEMPLATE_PATHS])
+    ]
+    # Templates missing from the compiled modules are still loaded from source
+    if module_path is not None:
+        loaders.insert(0, ModuleLoader(str(module_path)))
+
+    bytecode_cache = None
+    if cache_path is not None:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(cache_path))
+
+    return Environment(
+        loader=ChoiceLoader(loaders),
+        bytecode_cache=bytecode_cache,
+        auto_reload=auto_reload,
+        # https://github.com/hyde/hyde-old/issues/68
+        comment_start_string="{##",
+        comment_end_string="##}",
+        trim_blocks=True,
+        lstrip_blocks=True,
+        autoescape=True,
+    )
+
+
+# Subsequent renders load templates from source again. Bytecode cache entries
+# don't have to be dropped, they're only used if the source is unchanged.
+def invalidate(environment: Environment) -> None:
+    loader = environment.loader
+    if isinstance(loader, ChoiceLoader):
+        loader.loaders = [
+            loader_
+            for loader_ in loader.loaders
+            if not isinstance(loader_, ModuleLoader)
+        ]
+
+    if environment.cache is not None:
+        environment.cache.clear()
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Compile templates ahead of time")
+    parser.add_argument(
+        "target", type=Path, help="directory compiled templates are written to"
+    )
+    arguments = parser.parse_args()
+
+    build_environment().compile_templates(
+        str(arguments.target), zip=None, log_function=info
+    )
+
+
+if __name__ == "__main__":
+    main()
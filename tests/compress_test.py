@@ -0,0 +1,50 @@
+from gzip import decompress
+from typing import List
+from typing import Optional
+
+import pytest
+
+from bridges.blog.compress import compress
+from bridges.blog.compress import MINIMUM_SIZE
+from bridges.blog.compress import negotiate
+
+AVAILABLE = ["br", "zstd", "gzip"]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,available,expected",
+    [
+        (None, AVAILABLE, None),
+        ("", AVAILABLE, None),
+        ("gzip", AVAILABLE, "gzip"),
+        ("GZIP", AVAILABLE, "gzip"),
+        ("gzip, deflate, br", AVAILABLE, "br"),
+        # Ties are broken by the order of `available`
+        ("gzip, zstd", AVAILABLE, "zstd"),
+        ("br;q=0.5, gzip", AVAILABLE, "gzip"),
+        ("br;q=0, gzip;q=0", AVAILABLE, None),
+        ("br; q=0.8, gzip ;q=0.9", AVAILABLE, "gzip"),
+        ("br;q=invalid, gzip;q=0.1", AVAILABLE, "gzip"),
+        ("*", AVAILABLE, "br"),
+        ("*, br;q=0", AVAILABLE, "zstd"),
+        ("identity", AVAILABLE, None),
+        ("br", ["gzip"], None),
+        ("gzip", [], None),
+    ],
+)
+def test_negotiate(
+    accept_encoding: Optional[str], available: List[str], expected: Optional[str]
+) -> None:
+    assert negotiate(accept_encoding, available) == expected
+
+
+def test_small_bodies_are_not_compressed() -> None:
+    assert compress(b"x" * (MINIMUM_SIZE - 1)) == {}
+
+
+def test_variants_decompress_to_the_body() -> None:
+    body = b"<p>Compressible</p>" * MINIMUM_SIZE
+    variants = compress(body)
+
+    assert decompress(variants["gzip"]) == body
+    assert all(len(variant) < len(body) for variant in variants.values())
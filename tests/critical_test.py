@@ -0,0 +1,40 @@
+from json import loads
+from pathlib import Path
+
+import pytest
+
+from critical import build
+from critical import CRITICAL_FOLDER
+from critical import MANIFEST
+from critical import TEMPLATES
+
+BLOG_PATH = Path(__file__).parent / "blog"
+
+ABOVE_FOLD = "body{margin:0}"
+UNUSED = ".unused{color:red}"
+
+
+# Renders the site from the blog next to the tests, the way `make critical` does
+def test_build(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PT_BLOG_PATH", str(BLOG_PATH))
+    monkeypatch.setenv("PT_ENABLE_GITHUB", "False")
+    monkeypatch.setenv("PT_ENABLE_SPOTIFY", "False")
+
+    for template in TEMPLATES.values():
+        for sheet in template.sheets:
+            (tmp_path / sheet).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / sheet).write_text(ABOVE_FOLD + UNUSED)
+
+    assert build(tmp_path, strict=True)
+
+    manifest = loads((tmp_path / CRITICAL_FOLDER / MANIFEST).read_text())
+    # `base` isn't rendered on its own
+    assert set(manifest["templates"]) == {"home", "blog-post", "blog-tag"}
+
+    for name, entry in manifest["templates"].items():
+        critical = (tmp_path / entry["critical"]).read_text()
+        assert ABOVE_FOLD in critical
+        assert UNUSED not in critical
+
+        stylesheet = (tmp_path / entry["stylesheet"]).read_text()
+        assert stylesheet.count(UNUSED) == len(TEMPLATES[name].sheets)
@@ -0,0 +1,246 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from json import dumps
+from threading import Lock
+from threading import Thread
+from time import sleep
+from time import time
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+import pytest
+
+from bridges.github import GitHub
+
+USER = "user"
+ORGS = ["first", "second", "third"]
+ADDITIONAL = ["someone/else", "another/one"]
+# Seconds every org and additional repo takes to respond
+LATENCY = 0.2
+
+
+def repo(name: str, stars: int, fork: bool = False) -> Dict[str, object]:
+    return {
+        "html_url": f"https://github.com/{name}",
+        "name": name.split("/")[-1],
+        "watchers_count": stars,
+        "stargazers_count": stars,
+        "fork": fork,
+        "archived": False,
+        "description": f"Description of {name}",
+        "forks": 0,
+        "language": "Python",
+    }
+
+
+# Pages per path, repos of the user span several pages
+PAGES: Dict[str, List[List[Dict[str, object]]]] = {
+    f"/users/{USER}/repos": [
+        [repo(f"{USER}/page-{page}-{index}", page * 10 + index) for index in range(3)]
+        for page in range(1, 4)
+    ],
+    f"/users/{USER}/orgs": [[{"login": org} for org in ORGS]],
+    **{f"/orgs/{org}/repos": [[repo(f"{org}/{org}", 100)]] for org in ORGS},
+}
+SINGLE = {f"/repos/{name}": repo(name, 1000, fork=True) for name in ADDITIONAL}
+
+
+class Stub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+
+        # (path, page, `If-None-Match`, status) of every request
+        self.requests: List[Tuple[str, int, Optional[str], int]] = []
+        # Requests for repos of orgs currently being answered, and the most at once
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Remaining requests and seconds until the rate limit is reset
+        self.rate_limit = (5000, 3600.0)
+        self.lock = Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: Stub
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+
+        org = url.path.startswith("/orgs/")
+        slow = org or url.path.startswith("/repos/")
+        with self.server.lock:
+            if org:
+                self.server.in_flight += 1
+                self.server.max_in_flight = max(
+                    self.server.max_in_flight, self.server.in_flight
+                )
+            remaining, reset = self.server.rate_limit
+
+        if slow:
+            sleep(LATENCY)
+
+        body: object = None
+        headers = {
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(time() + reset),
+        }
+        if url.path in PAGES:
+            pages = PAGES[url.path]
+            body = pages[page - 1]
+            base = f"{self.server.url}{url.path}?per_page=100"
+            links = [f'<{base}&page={len(pages)}>; rel="last"']
+            if page < len(pages):
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+            headers["Link"] = ", ".join(links)
+        elif url.path in SINGLE:
+            body = SINGLE[url.path]
+
+        content = dumps(body).encode()
+        etag = f'"{hash(content)}"'
+        if_none_match = self.headers.get("If-None-Match", None)
+        if body is None:
+            status = 404
+        elif if_none_match == etag:
+            status = 304
+        else:
+            status = 200
+
+        with self.server.lock:
+            if org:
+                self.server.in_flight -= 1
+            self.server.requests.append((url.path, page, if_none_match, status))
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        else:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+@pytest.fixture
+def stub() -> Iterator[Stub]:
+    server = Stub()
+    thread = Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def github(stub: Stub) -> GitHub:
+    return GitHub(
+        USER,
+        refresh_delay=60,
+        additional_repos=ADDITIONAL,
+        include_orgs=True,
+        base_url=stub.url,
+    )
+
+
+def test_every_page_and_source_is_fetched(stub: Stub) -> None:
+    bridge = github(stub)
+    assert bridge.refresh()
+
+    assert sorted(
+        (path, page) for path, page, _, _ in stub.requests if "/users/" in path
+    ) == [
+        (f"/users/{USER}/orgs", 1),
+        (f"/users/{USER}/repos", 1),
+        (f"/users/{USER}/repos", 2),
+        (f"/users/{USER}/repos", 3),
+    ]
+
+    # Sorted by stars, explicitly listed repos are shown even though they're forks
+    assert [repo.url for repo in bridge.repos] == [
+        *(f"https://github.com/{name}" for name in ADDITIONAL),
+        *(f"https://github.com/{org}/{org}" for org in ORGS),
+        *(
+            f"https://github.com/{USER}/page-{page}-{index}"
+            for page in range(3, 0, -1)
+            for index in range(2, -1, -1)
+        ),
+    ]
+    assert bridge.generation == 1
+
+
+def test_orgs_and_additional_repos_are_fetched_concurrently(stub: Stub) -> None:
+    bridge = github(stub)
+
+    start = time()
+    assert bridge.refresh()
+    elapsed = time() - start
+
+    assert stub.max_in_flight == len(ORGS)
+    # Sequentially, this would take a `LATENCY` per org (and additional repo)
+    assert elapsed < 2 * LATENCY
+
+
+def test_unchanged_responses_are_revalidated(stub: Stub) -> None:
+    bridge = github(stub)
+    assert bridge.refresh()
+    repos = bridge.repos
+    first = len(stub.requests)
+
+    assert bridge.refresh()
+    revalidated = stub.requests[first:]
+
+    assert len(revalidated) == first
+    assert all(
+        if_none_match is not None and status == 304
+        for _, _, if_none_match, status in revalidated
+    )
+    assert bridge.repos == repos
+    assert bridge.generation == 1
+
+
+def test_failed_sources_keep_previous_repos(stub: Stub) -> None:
+    bridge = github(stub)
+    assert bridge.refresh()
+    repos = bridge.repos
+
+    bridge.additional_repos = [*ADDITIONAL, "missing/repo"]
+    assert not bridge.refresh()
+    assert bridge.repos == repos
+
+
+def test_interval_adapts_to_the_rate_limit(stub: Stub) -> None:
+    bridge = github(stub)
+    assert bridge.refresh()
+    assert bridge.interval == bridge.refresh_delay
+
+    # A refresh takes one request per URL
+    requests = len(stub.requests)
+    stub.rate_limit = (requests * 2, 3600.0)
+    assert bridge.refresh()
+    assert bridge.interval == pytest.approx(1800.0, abs=5.0)
+
+    # Exhausted, the next refresh waits for the rate limit to be reset
+    stub.rate_limit = (0, 3600.0)
+    assert bridge.refresh()
+    assert bridge.interval == pytest.approx(3600.0, abs=5.0)
+    assert bridge.due_in() == pytest.approx(3600.0, abs=5.0)
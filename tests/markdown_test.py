@@ -0,0 +1,48 @@
+from pathlib import Path
+from random import Random
+
+import pytest
+
+from bridges.blog import markdown
+from bridges.blog.markdown import build_markdown
+from bridges.blog.markdown import Pool
+
+SAMPLES = [
+    "A footnote[^1]\n\n[^1]: Defined once",
+    "The same footnote[^1] twice[^1]\n\n[^1]: Referenced twice",
+    "!!! note\n    An admonition",
+    "- [x] Done\n- [ ] Open",
+    "++ctrl+alt+delete++ and ~~struck~~",
+    "Line  \nbreak",
+    "<div>Raw HTML</div>\n\n```python\nx = 1\n```",
+]
+# Posts of the blog next to the tests
+POSTS = sorted((Path(__file__).parent / "blog" / "post").glob("*/text.md"))
+
+
+# Pooled instances are reset and reused, which is only correct as long as reset
+# instances render exactly like fresh ones
+def test_reset_instances_match_fresh_ones() -> None:
+    random = Random(0)  # nosec
+    samples = SAMPLES + [post.read_text() for post in POSTS]
+    instance = build_markdown()
+
+    for sample in random.choices(samples, k=100):
+        assert instance.convert(sample) == build_markdown().convert(sample)
+        instance.reset()
+
+
+def test_failed_builds_free_their_slot(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail() -> None:
+        raise RuntimeError("build failed")
+
+    pool = Pool(1, 0.0)
+    monkeypatch.setattr(markdown, "build_markdown", fail)
+    with pytest.raises(RuntimeError):
+        pool.convert("*text*")
+    assert pool.stats().created == 0
+
+    monkeypatch.undo()
+    assert pool.convert("*text*") == "<p><em>text</em></p>"
+    assert pool.stats().created == 1
+    assert pool.stats().overflow == 0
@@ -0,0 +1,40 @@
+from metrics import Exposition
+from metrics import Histogram
+
+
+def test_histogram_exposition() -> None:
+    histogram = Histogram((0.1, 1.0))
+    histogram.observe("post", 0.05)
+    histogram.observe("post", 0.1)
+    histogram.observe("post", 0.5)
+    histogram.observe("post", 2.0)
+    histogram.observe('home "\\', 0.5)
+
+    exposition = Exposition()
+    histogram.expose(exposition, "request_duration_seconds", "Requests", "route")
+
+    # Buckets are cumulative, bounds are inclusive, and series are sorted by label
+    assert exposition.text().splitlines() == [
+        "# HELP pt_request_duration_seconds Requests",
+        "# TYPE pt_request_duration_seconds histogram",
+        'pt_request_duration_seconds_bucket{route="home \\"\\\\",le="0.1"} 0',
+        'pt_request_duration_seconds_bucket{route="home \\"\\\\",le="1.0"} 1',
+        'pt_request_duration_seconds_bucket{route="home \\"\\\\",le="+Inf"} 1',
+        'pt_request_duration_seconds_sum{route="home \\"\\\\"} 0.5',
+        'pt_request_duration_seconds_count{route="home \\"\\\\"} 1',
+        'pt_request_duration_seconds_bucket{route="post",le="0.1"} 2',
+        'pt_request_duration_seconds_bucket{route="post",le="1.0"} 3',
+        'pt_request_duration_seconds_bucket{route="post",le="+Inf"} 4',
+        'pt_request_duration_seconds_sum{route="post"} 2.65',
+        'pt_request_duration_seconds_count{route="post"} 4',
+    ]
+
+
+def test_empty_histogram_exposition() -> None:
+    exposition = Exposition()
+    Histogram().expose(exposition, "request_duration_seconds", "Requests", "route")
+
+    assert exposition.text().splitlines() == [
+        "# HELP pt_request_duration_seconds Requests",
+        "# TYPE pt_request_duration_seconds histogram",
+    ]
@@ -0,0 +1,66 @@
+from asyncio import run
+from datetime import datetime
+from datetime import timezone
+from threading import get_ident
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import pytest
+
+from bridges.blog.page import CachedPage
+from bridges.blog.page import format_http_date
+from bridges.blog.page import not_modified
+
+MODIFIED = datetime(2022, 1, 1, tzinfo=timezone.utc)
+ETAG = '"abc"'
+
+
+def test_cached_pages_are_built_off_the_event_loop() -> None:
+    key = [0]
+    builds: List[int] = []
+
+    def build() -> Tuple[bytes, datetime]:
+        builds.append(get_ident())
+        return f"generation {key[0]}".encode(), MODIFIED
+
+    page = CachedPage(lambda: key[0], build)
+
+    async def get() -> bytes:
+        return (await page.get_async()).body
+
+    assert run(get()) == b"generation 0"
+    assert run(get()) == b"generation 0"
+    key[0] += 1
+    assert run(get()) == b"generation 1"
+
+    assert len(builds) == 2
+    assert get_ident() not in builds
+
+
+@pytest.mark.parametrize(
+    "if_none_match,if_modified_since,expected",
+    [
+        (None, None, False),
+        ('"abc"', None, True),
+        ('W/"abc"', None, True),
+        ('"other", "abc"', None, True),
+        ('"abc-gzip"', None, False),
+        ("*", None, True),
+        ('"other"', None, False),
+        # `If-Modified-Since` is ignored if `If-None-Match` is present
+        ('"other"', format_http_date(MODIFIED), False),
+        (None, format_http_date(MODIFIED), True),
+        (None, "Fri, 31 Dec 2021 23:59:59 GMT", False),
+        (None, "Sun, 02 Jan 2022 00:00:00 GMT", True),
+        (None, "not a date", False),
+    ],
+)
+def test_not_modified(
+    if_none_match: Optional[str], if_modified_since: Optional[str], expected: bool
+) -> None:
+    # Sub-second precision is lost in HTTP dates
+    last_modified = MODIFIED.replace(microsecond=500000)
+    assert (
+        not_modified(if_none_match, if_modified_since, ETAG, last_modified) is expected
+    )
@@ -0,0 +1,139 @@
+from pathlib import Path
+from re import compile as re_compile
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import pytest
+from bs4 import BeautifulSoup
+
+from bridges.blog.markdown import render
+from bridges.blog.pattern import CAPTION
+from bridges.blog.pattern import IMAGE
+from bridges.blog.read_time import CAPTION_DESCRIPTION
+from bridges.blog.read_time import DEFAULT_DESCRIPTION
+from bridges.blog.read_time import Hint
+from bridges.blog.read_time import IMAGE_DESCRIPTION
+from bridges.blog.read_time import IMPACT
+from bridges.blog.read_time import ReadTime
+from bridges.blog.time import Time
+
+DEFAULT = re_compile(r".*")
+
+POSTS = [
+    """# Title
+
+Some *emphasis*, `code` and a [link](https://example.com/?a=1&b=2).
+
+![Alt text](image.png)
+
+<figure>
+  <img src="figure.png" alt='A "quoted" figure'>
+  <figcaption>A caption with <em>markup</em></figcaption>
+</figure>
+
+<details><summary>Spoiler</summary>Hidden text with an ![image](hidden.png)</details>
+
+```python
+def greet(name: str) -> str:
+    return f"Hello {name}"
+```
+
+| key | value |
+|---|---|
+| a | 1 |
+| b | 2 |
+
+1. First
+2. Second
+    - Nested
+
+> Quoted <span class="  a   b ">text</span> &amp; entities &copy; &lt;tags&gt;
+
+Text with a footnote[^1].
+
+[^1]: The footnote.
+""",
+    """<p>Raw HTML paragraph<div>closes it</div></p>
+
+<ul><li>One<li>Two</ul>
+
+<pre>
+preformatted
+</pre>
+
+<!-- A comment -->
+
+Line<br>break
+""",
+    "",
+]
+# Constructs html5lib rearranges while parsing
+REARRANGED = [
+    "<b>Misnested <i>formatting</b> elements</i>",
+    "<table>Text within a table<tr><td>Cell</td></tr></table>",
+    '<svg viewBox="0 0 1 1"><circle r="1"/></svg>',
+]
+HINTS = [[], ["details"], ["pre"], ["details", "pre"]]
+# Posts of the blog next to the tests
+BLOG_POSTS = sorted((Path(__file__).parent / "blog" / "post").glob("*/text.md"))
+
+
+# `ReadTime` prior to counting and removing matches in a single scan
+def _previous(post_content: str, ignored_tags: List[str]) -> Tuple[Dict, Time, int]:
+    soup = BeautifulSoup(post_content, features="html5lib")
+    for tag in ignored_tags:
+        for element in soup.find_all(tag):
+            element.decompose()
+    content = str(soup)
+
+    overall_time = Time()
+    breakdown = {}
+    words = 0
+
+    for pattern, regex in (
+        (IMAGE_DESCRIPTION, IMAGE),
+        (CAPTION_DESCRIPTION, CAPTION),
+        (DEFAULT_DESCRIPTION, DEFAULT),
+    ):
+        count = 0
+        lines = 0
+        words = 0
+
+        for match in regex.finditer(content):
+            matched = match.group()
+            count += 1
+            lines += len([line for line in matched.split("\n") if line != ""])
+            words += len(matched.split(" "))
+
+        time = Time.from_seconds(
+            IMPACT[pattern].per_occurrence * count
+            + IMPACT[pattern].per_line * lines
+            + IMPACT[pattern].per_word * words
+        )
+        breakdown[pattern] = (count, time)
+        overall_time += time
+
+        content = regex.sub("", content)
+
+    return breakdown, overall_time, words
+
+
+def _samples() -> List[str]:
+    return [
+        render(post) for post in POSTS + [path.read_text() for path in BLOG_POSTS]
+    ] + REARRANGED
+
+
+@pytest.mark.parametrize("ignored_tags", HINTS)
+def test_read_time_matches_previous(ignored_tags: List[str]) -> None:
+    for sample in _samples():
+        read_time = ReadTime(sample, Hint(ignored_tags))
+        breakdown, overall_time, word_count = _previous(sample, ignored_tags)
+
+        assert {
+            pattern: (entry.count, entry.time)
+            for pattern, entry in read_time.time_breakdown.items()
+        } == breakdown
+        assert read_time.overall_time == overall_time
+        assert read_time.word_count == word_count
@@ -0,0 +1,46 @@
+from asyncio import run
+from asyncio import sleep
+from time import monotonic
+from typing import List
+
+from bridges.scheduler import Scheduler
+
+
+class Bridge:
+    def __init__(self, due_in: float, expires_in: float) -> None:
+        self.due = monotonic() + due_in
+        self.expires = monotonic() + expires_in
+        self.events: List[str] = []
+
+    def refresh(self) -> bool:
+        self.events.append("refresh")
+        self.due = float("inf")
+        return True
+
+    def due_in(self) -> float:
+        return self.due - monotonic()
+
+    def expires_in(self) -> float:
+        return self.expires - monotonic()
+
+    def expire(self) -> None:
+        if self.expires_in() <= 0:
+            self.events.append("expire")
+            self.expires = float("inf")
+
+
+# Stored data stops being served on time, even if no refresh is due yet
+def test_data_expires_between_refreshes() -> None:
+    bridge = Bridge(due_in=0.3, expires_in=0.05)
+    scheduler = Scheduler(jitter=0.0)
+    scheduler.add("bridge", bridge)
+
+    async def main() -> None:
+        scheduler.start()
+        await sleep(0.2)
+        assert bridge.events == ["expire"]
+        await sleep(0.2)
+        scheduler.stop()
+
+    run(main())
+    assert bridge.events == ["expire", "refresh"]
@@ -0,0 +1,108 @@
+from threading import Lock
+from time import sleep
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pytest
+
+from bridges.spotify import PAGE_SIZE
+from bridges.spotify import Playlist
+from bridges.spotify import smallest_fitting
+from bridges.spotify import Spotify
+
+USER = "user"
+# Seconds every page after the first one takes to respond
+LATENCY = 0.1
+
+
+def playlist(index: int) -> Dict[str, object]:
+    return {
+        "name": f"Playlist {index}",
+        "external_urls": {"spotify": f"https://open.spotify.com/playlist/{index}"},
+        "images": [{"url": f"https://i.scdn.co/{index}.jpg", "width": 300}],
+    }
+
+
+# Stands in for `spotipy.Spotify`, serves `total` playlists in pages
+class FakeSpotipy:
+    def __init__(self, total: int) -> None:
+        self.playlists = [playlist(index) for index in range(total)]
+
+        self.offsets: List[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = Lock()
+
+    def user_playlists(self, user: str, limit: int, offset: int) -> Dict[str, object]:
+        assert user == USER
+        assert limit == PAGE_SIZE
+
+        with self._lock:
+            self.offsets.append(offset)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        if offset > 0:
+            sleep(LATENCY)
+
+        with self._lock:
+            self.in_flight -= 1
+
+        return {
+            "total": len(self.playlists),
+            "items": self.playlists[offset : offset + limit],
+        }
+
+
+@pytest.mark.parametrize("total", [0, 1, PAGE_SIZE, PAGE_SIZE * 2, PAGE_SIZE * 4 + 1])
+def test_every_page_is_fetched_in_order(total: int) -> None:
+    client = FakeSpotipy(total)
+    bridge = Spotify(USER, client, workers=4)  # type: ignore
+
+    assert bridge.refresh()
+
+    # Pages beyond `total` are never requested
+    assert sorted(client.offsets) == list(range(0, max(total, 1), PAGE_SIZE))
+    assert bridge.playlists == [
+        Playlist(
+            f"Playlist {index}",
+            f"https://open.spotify.com/playlist/{index}",
+            f"https://i.scdn.co/{index}.jpg",
+        )
+        for index in range(total)
+    ]
+
+
+def test_pages_are_fetched_concurrently() -> None:
+    client = FakeSpotipy(PAGE_SIZE * 4)
+    bridge = Spotify(USER, client, workers=4)  # type: ignore
+
+    assert bridge.refresh()
+    # Every page after the first one
+    assert client.max_in_flight == 3
+
+
+def image(width: Optional[int]) -> Dict[str, object]:
+    return {"url": f"{width}.jpg", "width": width}
+
+
+@pytest.mark.parametrize(
+    "images,expected",
+    [
+        # Largest first, as listed by Spotify
+        ([image(640), image(300), image(60)], "300.jpg"),
+        ([image(640), image(200), image(60)], "200.jpg"),
+        # Nothing fits, the largest image is used instead
+        ([image(150), image(60)], "150.jpg"),
+        ([image(60), image(150)], "150.jpg"),
+        # Sizes are unknown for some playlists
+        ([image(None), image(300)], "300.jpg"),
+        ([image(None)], "None.jpg"),
+        ([], None),
+    ],
+)
+def test_smallest_fitting(
+    images: List[Dict[str, object]], expected: Optional[str]
+) -> None:
+    assert smallest_fitting(images, 200) == expected